@@ -0,0 +1,870 @@
+import time
+import asyncio
+from contextlib import AbstractContextManager, nullcontext
+from typing import Any, AsyncIterator, Iterable, Literal, TypeVar
+
+import httpx
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyClientCredentials
+
+from utils import chunks, spotify_id, spotify_uri, scope_builder
+from rate_limit import endpoint_key, parse_retry_after
+from metrics import ApiMetrics
+from token_manager import TokenManager
+from spotipy_client import BulkAddResult
+from audio_features_cache import AudioFeaturesCache
+from mytypes.decode import fast as fast_decode, lazy as lazy_decode, loads
+from mytypes.projection import Projection, fields_param, with_field
+from mytypes.identity import IdentityMap, detached
+from mytypes.types import (
+    PagedSimplifiedEpisodeObject,
+    SimplifiedEpisodeObject,
+    Show,
+    PlaybackState,
+    PlaylistObject,
+    AudioFeaturesObject,
+    PlaylistTrackObject,
+    PagedPlaylistTrackObject,
+    PagedSimplifiedPlaylistObject,
+)
+
+API_PREFIX = 'https://api.spotify.com/v1/'
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_TIMEOUT = httpx.Timeout(10, connect=3.05)
+DEFAULT_RATE_LIMIT_RETRIES = 5
+# Requests in flight at once per client, so that fanning out over many pages does not run into 429s.
+DEFAULT_MAX_CONCURRENT_REQUESTS = 10
+
+T = TypeVar('T')
+
+
+def build_async_http(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+) -> httpx.AsyncClient:
+    """Pooled keep-alive HTTP client, share one between clients to share its connections."""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+class AsyncSpotipyClient:
+    """
+    Asyncio version of `SpotipyClient` returning the same `mytypes.types` objects,
+    so that many requests can be awaited concurrently with `asyncio.gather`.
+
+    Env vars must be set:
+    SPOTIPY_CLIENT_ID=...
+    SPOTIPY_CLIENT_SECRET=...
+    SPOTIPY_REDIRECT_URI=...
+    """
+
+    def __init__(
+        self,
+        username: str | None = None,
+        scope: str | list[str] | None = None,
+        http: httpx.AsyncClient | None = None,
+        rate_limit_retries: int = DEFAULT_RATE_LIMIT_RETRIES,
+        lazy: bool = False,
+        fast: bool = False,
+        identity_map: IdentityMap | None = None,
+        api_prefix: str = API_PREFIX,
+        access_token: str | None = None,
+        metrics: ApiMetrics | None = None,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+    ) -> None:
+        """
+        http: HTTP client to send requests through, a pooled client is built if None.
+        rate_limit_retries: how many times a request is retried after waiting out a 429 response.
+        lazy: decode nested objects of responses on first attribute access instead of up front.
+        fast: decode responses with compiled decoders, see `mytypes.decode.fast`.
+        identity_map: share albums, artists and images between decoded responses, see `mytypes.identity`.
+                      Pass an `IdentityMap()`, or the same one to several clients to share it.
+        api_prefix: base URL of the API, e.g. the one of `benchmarks.stub_server`.
+        access_token: send this token instead of authenticating, `username` and `scope` are then ignored.
+        metrics: where to record requests, see `metrics`.
+                 Pass the same one to several clients to report them together.
+        max_concurrent_requests: requests sent at once, the others wait for one of them to finish.
+        """
+        if lazy and fast:
+            raise ValueError('Choose either lazy or fast decoding')
+        self.username = username
+        self.lazy = lazy
+        self.fast = fast
+        self.identity_map = identity_map
+        self.http = http or build_async_http()
+        self.rate_limit_retries = rate_limit_retries
+        self.api_prefix = api_prefix
+        self.access_token = access_token
+        self.metrics = metrics or ApiMetrics()
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.auth_manager: TokenManager | SpotifyClientCredentials | None
+        if access_token:
+            self.auth_manager = None
+        elif username:
+            self.auth_manager = TokenManager(username=username, scope=scope_builder(scope))
+        else:
+            self.auth_manager = SpotifyClientCredentials()
+
+    async def __aenter__(self) -> 'AsyncSpotipyClient':
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    def _parse(self, cls: type[T], data: dict[str, Any]) -> T:
+        with self._identity_map_active():
+            if self.fast:
+                return fast_decode(cls, data)
+            return lazy_decode(cls, data) if self.lazy else cls(**data)
+
+    def _identity_map_active(self) -> AbstractContextManager:
+        return self.identity_map.active() if self.identity_map is not None else nullcontext()
+
+    def _parse_fields(self, cls: type[T], data: dict[str, Any], fields: str | Projection | None) -> T:
+        # Filtered responses lack the fields that were not selected, so they are decoded into partial objects,
+        # which must not be shared with full reads of the same entities.
+        if not fields:
+            return self._parse(cls, data)
+        with detached():
+            return fields.parse(data) if isinstance(fields, Projection) else lazy_decode(cls, data)
+
+    async def _auth_headers(self) -> dict[str, str]:
+        if self.auth_manager is None:
+            token = self.access_token
+        elif isinstance(self.auth_manager, TokenManager):
+            # Served from memory, unless the background refresh has failed and the token must be refreshed here.
+            token = self.auth_manager.cached_access_token()
+            if token is None:
+                token = await asyncio.to_thread(self.auth_manager.get_access_token, as_dict=False)
+        else:
+            # May read the cache file or request a new token.
+            token = await asyncio.to_thread(self.auth_manager.get_access_token, as_dict=False)
+        return {'Authorization': f'Bearer {token}'}
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        payload: Any = None,
+        content: str | None = None,
+        content_type: str | None = None,
+    ) -> Any:
+        if not url.startswith('http'):
+            url = self.api_prefix + url
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        endpoint = endpoint_key(method, url)
+
+        for attempt in range(self.rate_limit_retries + 1):
+            if attempt:
+                self.metrics.observe_retries(endpoint)
+            headers = await self._auth_headers()
+            if content_type:
+                headers['Content-Type'] = content_type
+            async with self.semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self.http.request(
+                        method,
+                        url,
+                        # An empty dict would drop the query of `next` URLs.
+                        params=params or None,
+                        json=payload,
+                        content=content,
+                        headers=headers,
+                    )
+                except httpx.TransportError:
+                    self.metrics.observe_request(endpoint, None, time.perf_counter() - start)
+                    raise
+            self.metrics.observe_request(
+                endpoint,
+                response.status_code,
+                time.perf_counter() - start,
+                len(response.content),
+            )
+            if response.status_code != 429:
+                break
+            retry_after_s = parse_retry_after(response.headers.get('Retry-After'))
+            self.metrics.observe_wait(endpoint, retry_after_s)
+            await asyncio.sleep(retry_after_s)
+
+        if response.is_error:
+            try:
+                error = loads(response.content).get('error', {})
+                msg, reason = error.get('message'), error.get('reason')
+            except ValueError:
+                msg, reason = response.text or None, None
+            raise SpotifyException(
+                response.status_code,
+                -1,
+                f'{response.url}:\n {msg}',
+                reason=reason,
+                headers=response.headers,
+            )
+        return loads(response.content) if response.content else None
+
+    async def _get(self, url: str, **params: Any) -> Any:
+        return await self._request('GET', url, params=params)
+
+    async def _post(self, url: str, payload: Any = None, **params: Any) -> Any:
+        return await self._request('POST', url, params=params, payload=payload)
+
+    async def _put(self, url: str, payload: Any = None, **params: Any) -> Any:
+        return await self._request('PUT', url, params=params, payload=payload)
+
+    async def _delete(self, url: str, payload: Any = None, **params: Any) -> Any:
+        return await self._request('DELETE', url, params=params, payload=payload)
+
+    async def next(self, result: dict[str, Any]) -> dict[str, Any] | None:
+        """Returns the next page of a paged result, if any."""
+        return await self._get(result['next']) if result.get('next') else None
+
+    async def track(self, track_id: str, market: str | None = None) -> Any:
+        return await self._get(f'tracks/{spotify_id(track_id)}', market=market)
+
+    async def tracks(self, tracks: Iterable[str], market: str | None = None) -> Any:
+        return await self._get('tracks', ids=','.join(spotify_id(t) for t in tracks), market=market)
+
+    async def artist(self, artist_id: str) -> Any:
+        return await self._get(f'artists/{spotify_id(artist_id)}')
+
+    async def artists(self, artists: Iterable[str]) -> Any:
+        return await self._get('artists', ids=','.join(spotify_id(a) for a in artists))
+
+    async def artist_albums(
+        self,
+        artist_id: str,
+        album_type: str | None = None,
+        country: str | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Any:
+        return await self._get(
+            f'artists/{spotify_id(artist_id)}/albums',
+            include_groups=album_type,
+            country=country,
+            limit=limit,
+            offset=offset,
+        )
+
+    async def artist_top_tracks(self, artist_id: str, country: str = 'US') -> Any:
+        return await self._get(f'artists/{spotify_id(artist_id)}/top-tracks', country=country)
+
+    async def artist_related_artists(self, artist_id: str) -> Any:
+        return await self._get(f'artists/{spotify_id(artist_id)}/related-artists')
+
+    async def album(self, album_id: str, market: str | None = None) -> Any:
+        return await self._get(f'albums/{spotify_id(album_id)}', market=market)
+
+    async def album_tracks(self, album_id: str, limit: int = 50, offset: int = 0, market: str | None = None) -> Any:
+        return await self._get(f'albums/{spotify_id(album_id)}/tracks', limit=limit, offset=offset, market=market)
+
+    async def albums(self, albums: list[str], market: str | None = None) -> Any:
+        return await self._get('albums', ids=','.join(spotify_id(a) for a in albums), market=market)
+
+    async def show(self, show_id: str, market: str | None = None) -> Show:
+        data = await self._get(f'shows/{spotify_id(show_id)}', market=market)
+        return self._parse(Show, data)
+
+    async def shows(self, shows: Iterable[str], market: str | None = None) -> Any:
+        return await self._get('shows', ids=','.join(spotify_id(s) for s in shows), market=market)
+
+    async def show_episodes(
+        self,
+        show_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        market: str | None = None,
+    ) -> PagedSimplifiedEpisodeObject:
+        data = await self._get(f'shows/{spotify_id(show_id)}/episodes', limit=limit, offset=offset, market=market)
+        return self._parse(PagedSimplifiedEpisodeObject, data)
+
+    async def all_show_episodes(
+        self,
+        show_id: str,
+        market: str | None = None,
+        total_episodes: int | None = None,
+    ) -> list[SimplifiedEpisodeObject]:
+        """ Get all episodes of a show, the pages are requested concurrently, see `max_concurrent_requests`.
+            Fetches the first page up front to learn the total if `total_episodes` is None.
+        """
+        limit = 50  # Max episode retrieval per page.
+        episodes: list[SimplifiedEpisodeObject] = []
+        if total_episodes is None:
+            first_page = await self.show_episodes(show_id=show_id, limit=limit, market=market)
+            episodes.extend(first_page.items)
+            offsets = range(limit, first_page.total, limit)
+        else:
+            offsets = range(0, total_episodes, limit)
+
+        pages = await asyncio.gather(
+            *(self.show_episodes(show_id=show_id, limit=limit, offset=offset, market=market) for offset in offsets)
+        )
+        for page in pages:
+            episodes.extend(page.items)
+        return episodes
+
+    async def episode(self, episode_id: str, market: str | None = None) -> Any:
+        return await self._get(f'episodes/{spotify_id(episode_id)}', market=market)
+
+    async def episodes(self, episodes: Iterable[str], market: str | None = None) -> Any:
+        return await self._get('episodes', ids=','.join(spotify_id(e) for e in episodes), market=market)
+
+    async def search(
+        self, q: str, limit: int = 10, offset: int = 0, type: str = 'track', market: str | None = None
+    ) -> Any:
+        return await self._get('search', q=q, limit=limit, offset=offset, type=type, market=market)
+
+    async def search_markets(
+        self,
+        q: str,
+        limit: int = 10,
+        offset: int = 0,
+        type: str = 'track',
+        markets: Iterable[str] = (),
+        total: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """ Search each of `markets` concurrently, returns the results by market and item type.
+            With `total`, the items are cut off after that many in total, in the order of `markets`.
+        """
+        markets = list(markets)
+        if total is not None:
+            limit = min(limit, total)
+        pages = await asyncio.gather(
+            *(self.search(q=q, limit=limit, offset=offset, type=type, market=market) for market in markets)
+        )
+        results: dict[str, dict[str, Any]] = {}
+        remaining = total
+        for market, page in zip(markets, pages):
+            results[market] = {}
+            for item_type in (f'{t}s' for t in type.split(',')):
+                result = page[item_type]
+                if remaining is not None:
+                    result['items'] = result['items'][:remaining]
+                    remaining -= len(result['items'])
+                results[market][item_type] = result
+        return results
+
+    async def user(self, user: str) -> Any:
+        return await self._get(f'users/{user}')
+
+    async def me(self) -> Any:
+        return await self._get('me')
+
+    async def current_user(self) -> Any:
+        return await self.me()
+
+    async def current_user_playlists(self, limit: int = 50, offset: int = 0) -> Any:
+        return await self._get('me/playlists', limit=limit, offset=offset)
+
+    async def user_playlists(self, user: str, limit: int = 50, offset: int = 0) -> PagedSimplifiedPlaylistObject:
+        data = await self._get(f'users/{user}/playlists', limit=limit, offset=offset)
+        return self._parse(PagedSimplifiedPlaylistObject, data)
+
+    async def current_user_saved_albums(self, limit: int = 20, offset: int = 0, market: str | None = None) -> Any:
+        return await self._get('me/albums', limit=limit, offset=offset, market=market)
+
+    async def current_user_saved_tracks(self, limit: int = 20, offset: int = 0, market: str | None = None) -> Any:
+        return await self._get('me/tracks', limit=limit, offset=offset, market=market)
+
+    async def current_user_saved_episodes(self, limit: int = 20, offset: int = 0, market: str | None = None) -> Any:
+        return await self._get('me/episodes', limit=limit, offset=offset, market=market)
+
+    async def current_user_saved_shows(self, limit: int = 20, offset: int = 0, market: str | None = None) -> Any:
+        return await self._get('me/shows', limit=limit, offset=offset, market=market)
+
+    async def _library_add(self, items: Iterable[str], type: str) -> Any:
+        return await self._put('me/library', uris=','.join(spotify_uri(item, type) for item in items))
+
+    async def _library_delete(self, items: Iterable[str], type: str) -> Any:
+        return await self._delete('me/library', uris=','.join(spotify_uri(item, type) for item in items))
+
+    async def _library_contains(self, items: Iterable[str], type: str) -> list[bool]:
+        return await self._get('me/library/contains', uris=','.join(spotify_uri(item, type) for item in items))
+
+    async def current_user_saved_albums_add(self, albums: Iterable[str] = ()) -> Any:
+        return await self._library_add(albums, 'album')
+
+    async def current_user_saved_albums_delete(self, albums: Iterable[str] = ()) -> Any:
+        return await self._library_delete(albums, 'album')
+
+    async def current_user_saved_albums_contains(self, albums: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(albums, 'album')
+
+    async def current_user_saved_tracks_add(self, tracks: Iterable[str] = ()) -> Any:
+        return await self._library_add(tracks, 'track')
+
+    async def current_user_saved_tracks_delete(self, tracks: Iterable[str] = ()) -> Any:
+        return await self._library_delete(tracks, 'track')
+
+    async def current_user_saved_tracks_contains(self, tracks: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(tracks, 'track')
+
+    async def current_user_saved_episodes_add(self, episodes: Iterable[str] = ()) -> Any:
+        return await self._library_add(episodes, 'episode')
+
+    async def current_user_saved_episodes_delete(self, episodes: Iterable[str] = ()) -> Any:
+        return await self._library_delete(episodes, 'episode')
+
+    async def current_user_saved_episodes_contains(self, episodes: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(episodes, 'episode')
+
+    async def current_user_saved_shows_add(self, shows: Iterable[str] = ()) -> Any:
+        return await self._library_add(shows, 'show')
+
+    async def current_user_saved_shows_delete(self, shows: Iterable[str] = ()) -> Any:
+        return await self._library_delete(shows, 'show')
+
+    async def current_user_saved_shows_contains(self, shows: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(shows, 'show')
+
+    async def current_user_followed_artists(self, limit: int = 20, after: str | None = None) -> Any:
+        return await self._get('me/following', type='artist', limit=limit, after=after)
+
+    async def current_user_following_artists(self, ids: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(ids, 'artist')
+
+    async def current_user_following_users(self, ids: Iterable[str] = ()) -> list[bool]:
+        return await self._library_contains(ids, 'user')
+
+    async def user_follow_artists(self, ids: Iterable[str] = ()) -> Any:
+        return await self._library_add(ids, 'artist')
+
+    async def user_follow_users(self, ids: Iterable[str] = ()) -> Any:
+        return await self._library_add(ids, 'user')
+
+    async def user_unfollow_artists(self, ids: Iterable[str] = ()) -> Any:
+        return await self._library_delete(ids, 'artist')
+
+    async def user_unfollow_users(self, ids: Iterable[str] = ()) -> Any:
+        return await self._library_delete(ids, 'user')
+
+    async def current_user_top_artists(self, limit: int = 20, offset: int = 0, time_range: str = 'medium_term') -> Any:
+        return await self._get('me/top/artists', time_range=time_range, limit=limit, offset=offset)
+
+    async def current_user_top_tracks(self, limit: int = 20, offset: int = 0, time_range: str = 'medium_term') -> Any:
+        return await self._get('me/top/tracks', time_range=time_range, limit=limit, offset=offset)
+
+    async def current_user_recently_played(
+        self, limit: int = 50, after: int | None = None, before: int | None = None
+    ) -> Any:
+        return await self._get('me/player/recently-played', limit=limit, after=after, before=before)
+
+    async def playlist(
+        self,
+        playlist_id: str,
+        fields: str | Projection[PlaylistObject] | None = None,
+        market: str | None = None,
+        additional_types: Iterable[str] = ('track', ),
+    ) -> PlaylistObject:
+        data = await self._get(
+            f'playlists/{spotify_id(playlist_id)}',
+            fields=fields_param(PlaylistObject, fields),
+            market=market,
+            additional_types=','.join(additional_types),
+        )
+        return self._parse_fields(PlaylistObject, data, fields)
+
+    async def playlist_items(
+        self,
+        playlist_id: str,
+        fields: str | Projection[PagedPlaylistTrackObject] | None = None,
+        limit: int = 100,
+        offset: int = 0,
+        market: str | None = None,
+        additional_types: Iterable[str] = ('track', 'episode'),
+    ) -> PagedPlaylistTrackObject:
+        data = await self._get(
+            f'playlists/{spotify_id(playlist_id)}/tracks',
+            fields=fields_param(PagedPlaylistTrackObject, fields),
+            limit=limit,
+            offset=offset,
+            market=market,
+            additional_types=','.join(additional_types),
+        )
+        return self._parse_fields(PagedPlaylistTrackObject, data, fields)
+
+    async def iter_playlist_items(
+        self,
+        playlist_id: str,
+        fields: str | Projection[PagedPlaylistTrackObject] | None = None,
+        limit: int = 100,
+        offset: int = 0,
+        market: str | None = None,
+        additional_types: Iterable[str] = ('track', 'episode'),
+    ) -> AsyncIterator[PlaylistTrackObject]:
+        """ Iterate over all tracks and episodes of a playlist, the next page is requested
+            while the current one is consumed. `next` is added to `fields` to follow the pages.
+        """
+        if fields:
+            fields = with_field(fields, 'next')
+        data = await self._get(
+            f'playlists/{spotify_id(playlist_id)}/tracks',
+            fields=fields_param(PagedPlaylistTrackObject, fields),
+            limit=limit,
+            offset=offset,
+            market=market,
+            additional_types=','.join(additional_types),
+        )
+        while data:
+            next_page = asyncio.create_task(self.next(data))
+            try:
+                for item in self._parse_fields(PagedPlaylistTrackObject, data, fields).items:
+                    yield item
+            except BaseException:
+                next_page.cancel()
+                raise
+            data = await next_page
+
+    async def playlist_cover_image(self, playlist_id: str) -> Any:
+        return await self._get(f'playlists/{spotify_id(playlist_id)}/images')
+
+    async def playlist_upload_cover_image(self, playlist_id: str, image_b64: str) -> Any:
+        return await self._request(
+            'PUT',
+            f'playlists/{spotify_id(playlist_id)}/images',
+            content=image_b64,
+            content_type='image/jpeg',
+        )
+
+    async def user_playlist_create(
+        self,
+        user: str,
+        name: str,
+        public: bool = True,
+        collaborative: bool = False,
+        description: str = '',
+    ) -> PlaylistObject:
+        payload = {'name': name, 'public': public, 'collaborative': collaborative, 'description': description}
+        data = await self._post(f'users/{user}/playlists', payload=payload)
+        return self._parse(PlaylistObject, data)
+
+    async def playlist_change_details(
+        self,
+        playlist_id: str,
+        name: str | None = None,
+        public: bool | None = None,
+        collaborative: bool | None = None,
+        description: str | None = None,
+    ) -> Any:
+        payload = {'name': name, 'public': public, 'collaborative': collaborative, 'description': description}
+        return await self._put(
+            f'playlists/{spotify_id(playlist_id)}',
+            payload={
+                k: v
+                for k, v in payload.items() if v is not None
+            },
+        )
+
+    async def current_user_unfollow_playlist(self, playlist_id: str) -> Any:
+        return await self._delete(f'playlists/{spotify_id(playlist_id)}/followers')
+
+    async def current_user_follow_playlist(self, playlist_id: str) -> Any:
+        return await self._put(f'playlists/{spotify_id(playlist_id)}/followers')
+
+    async def playlist_is_following(self, playlist_id: str, user_ids: Iterable[str]) -> list[bool]:
+        return await self._get(f'playlists/{spotify_id(playlist_id)}/followers/contains', ids=','.join(user_ids))
+
+    async def playlist_add_items(
+        self,
+        playlist_id: str,
+        items: Iterable[str],
+        position: int | None = None,
+    ) -> dict[str, Any]:
+        return await self._post(
+            f'playlists/{spotify_id(playlist_id)}/tracks',
+            payload=[spotify_uri(item) for item in items],
+            position=position,
+        )
+
+    async def playlist_add_items_bulk(
+        self,
+        playlist_id: str,
+        items: Iterable[str],
+        position: int | None = None,
+        batch_size: int = 100,
+    ) -> BulkAddResult:
+        """ Adds any number of tracks/episodes to a playlist, in order, split into batches of max 100 items."""
+        result = BulkAddResult()
+        for batch in chunks(items, min(batch_size, 100)):
+            batch_position = position + result.total if position is not None else None
+            start = time.perf_counter()
+            response = await self.playlist_add_items(playlist_id=playlist_id, items=batch, position=batch_position)
+            result.batch_latencies_s.append(time.perf_counter() - start)
+            result.batch_sizes.append(len(batch))
+            result.snapshot_ids.append(response['snapshot_id'])
+        return result
+
+    async def playlist_replace_items(self, playlist_id: str, items: Iterable[str]) -> Any:
+        return await self._put(
+            f'playlists/{spotify_id(playlist_id)}/tracks',
+            payload={'uris': [spotify_uri(item) for item in items]},
+        )
+
+    async def playlist_reorder_items(
+        self,
+        playlist_id: str,
+        range_start: int,
+        insert_before: int,
+        range_length: int = 1,
+        snapshot_id: str | None = None,
+    ) -> Any:
+        payload: dict[str, Any] = {
+            'range_start': range_start,
+            'range_length': range_length,
+            'insert_before': insert_before,
+        }
+        if snapshot_id:
+            payload['snapshot_id'] = snapshot_id
+        return await self._put(f'playlists/{spotify_id(playlist_id)}/tracks', payload=payload)
+
+    async def playlist_remove_all_occurrences_of_items(
+        self,
+        playlist_id: str,
+        items: Iterable[str],
+        snapshot_id: str | None = None,
+    ) -> Any:
+        payload: dict[str, Any] = {'tracks': [{'uri': spotify_uri(item)} for item in items]}
+        if snapshot_id:
+            payload['snapshot_id'] = snapshot_id
+        return await self._delete(f'playlists/{spotify_id(playlist_id)}/tracks', payload=payload)
+
+    async def playlist_remove_specific_occurrences_of_items(
+        self,
+        playlist_id: str,
+        items: Iterable[dict[str, Any]],
+        snapshot_id: str | None = None,
+    ) -> Any:
+        """`items` are e.g. [{'uri': '4iV5W9uYEdYUVa79Axb7Rh', 'positions': [2]}]."""
+        payload: dict[str, Any] = {
+            'tracks': [{
+                'uri': spotify_uri(item['uri']),
+                'positions': item['positions']
+            } for item in items]
+        }
+        if snapshot_id:
+            payload['snapshot_id'] = snapshot_id
+        return await self._delete(f'playlists/{spotify_id(playlist_id)}/tracks', payload=payload)
+
+    async def user_playlist_add_tracks(
+        self,
+        user: str,
+        playlist_id: str,
+        tracks: Iterable[str],
+        position: int | None = None,
+    ) -> dict[str, Any]:
+        return await self.playlist_add_items(playlist_id=playlist_id, items=tracks, position=position)
+
+    async def user_playlist_replace_tracks(self, user: str, playlist_id: str, tracks: Iterable[str]) -> Any:
+        return await self.playlist_replace_items(playlist_id=playlist_id, items=tracks)
+
+    async def audio_analysis(self, track_id: str) -> Any:
+        return await self._get(f'audio-analysis/{spotify_id(track_id)}')
+
+    async def audio_features(self, tracks: Iterable[str] = []) -> list[AudioFeaturesObject]:
+        data = await self._get('audio-features', ids=','.join(spotify_id(t) for t in tracks))
+        # Unknown IDs have no features.
+        return [self._parse(AudioFeaturesObject, features) for features in data['audio_features'] if features]
+
+    async def audio_features_batched(
+        self,
+        tracks: Iterable[str],
+        cache: AudioFeaturesCache | None = None,
+    ) -> list[AudioFeaturesObject]:
+        """ Get audio features for any number of tracks, windows of 100 IDs are requested concurrently.
+            See `SpotipyClient.audio_features_batched`.
+        """
+        features = await self.audio_features_batched_raw(tracks=tracks, cache=cache)
+        return [self._parse(AudioFeaturesObject, data) for data in features]
+
+    async def audio_features_batched_raw(
+        self,
+        tracks: Iterable[str],
+        cache: AudioFeaturesCache | None = None,
+    ) -> list[dict[str, Any]]:
+        """Same as `audio_features_batched`, but returns the undecoded responses."""
+        ids = [spotify_id(track) for track in tracks]
+        features_by_id = cache.get_many(ids) if cache else {}
+        missing = list(dict.fromkeys(track_id for track_id in ids if track_id not in features_by_id))
+
+        windows = await asyncio.gather(
+            *(self._get('audio-features', ids=','.join(window)) for window in chunks(missing, 100))
+        )
+        fetched = [features for window in windows for features in window['audio_features'] if features]
+        features_by_id.update((features['id'], features) for features in fetched)
+        if cache:
+            cache.put_many(fetched)
+
+        return [features_by_id[track_id] for track_id in ids if track_id in features_by_id]
+
+    async def featured_playlists(
+        self,
+        locale: str | None = None,
+        country: str | None = None,
+        timestamp: str | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Any:
+        return await self._get(
+            'browse/featured-playlists',
+            locale=locale,
+            country=country,
+            timestamp=timestamp,
+            limit=limit,
+            offset=offset,
+        )
+
+    async def new_releases(self, country: str | None = None, limit: int = 20, offset: int = 0) -> Any:
+        return await self._get('browse/new-releases', country=country, limit=limit, offset=offset)
+
+    async def category(self, category_id: str, country: str | None = None, locale: str | None = None) -> Any:
+        return await self._get(f'browse/categories/{category_id}', country=country, locale=locale)
+
+    async def categories(
+        self,
+        country: str | None = None,
+        locale: str | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Any:
+        return await self._get('browse/categories', country=country, locale=locale, limit=limit, offset=offset)
+
+    async def category_playlists(
+        self, category_id: str, country: str | None = None, limit: int = 20, offset: int = 0
+    ) -> Any:
+        return await self._get(
+            f'browse/categories/{category_id}/playlists',
+            country=country,
+            limit=limit,
+            offset=offset,
+        )
+
+    async def recommendations(
+        self,
+        seed_artists: Iterable[str] | None = None,
+        seed_genres: Iterable[str] | None = None,
+        seed_tracks: Iterable[str] | None = None,
+        limit: int = 20,
+        country: str | None = None,
+        **tunables: Any,
+    ) -> Any:
+        """`tunables` are min_, max_ and target_ attributes of audio features, e.g. min_tempo=120."""
+        return await self._get(
+            'recommendations',
+            seed_artists=','.join(spotify_id(a) for a in seed_artists) if seed_artists else None,
+            seed_genres=','.join(seed_genres) if seed_genres else None,
+            seed_tracks=','.join(spotify_id(t) for t in seed_tracks) if seed_tracks else None,
+            limit=limit,
+            market=country,
+            **tunables,
+        )
+
+    async def recommendation_genre_seeds(self) -> Any:
+        return await self._get('recommendations/available-genre-seeds')
+
+    async def devices(self) -> Any:
+        return await self._get('me/player/devices')
+
+    async def current_playback(
+        self,
+        market: str | None = None,
+        additional_types: str | None = None,
+    ) -> PlaybackState | None:
+        state = await self._get('me/player', market=market, additional_types=additional_types)
+        return self._parse(PlaybackState, state) if state else state
+
+    async def currently_playing(self, market: str | None = None, additional_types: str | None = None) -> Any:
+        return await self._get('me/player/currently-playing', market=market, additional_types=additional_types)
+
+    async def current_user_playing_track(
+        self, market: str | None = None, additional_types: Iterable[str] = ('track', )
+    ) -> Any:
+        return await self._get(
+            'me/player/currently-playing',
+            market=market,
+            additional_types=','.join(additional_types),
+        )
+
+    async def transfer_playback(self, device_id: str, force_play: bool = True) -> Any:
+        return await self._put('me/player', payload={'device_ids': [device_id], 'play': force_play})
+
+    async def start_playback(
+        self,
+        device_id: str | None = None,
+        context_uri: str | None = None,
+        uris: Iterable[str] | None = None,
+        offset: dict[str, Any] | None = None,
+        position_ms: int | None = None,
+    ) -> Any:
+        payload: dict[str, Any] = {}
+        if context_uri is not None:
+            payload['context_uri'] = context_uri
+        if uris is not None:
+            payload['uris'] = list(uris)
+        if offset is not None:
+            payload['offset'] = offset
+        if position_ms is not None:
+            payload['position_ms'] = position_ms
+        return await self._put('me/player/play', payload=payload, device_id=device_id)
+
+    async def pause_playback(self, device_id: str | None = None) -> Any:
+        return await self._put('me/player/pause', device_id=device_id)
+
+    async def custom_toggle_playback(
+        self,
+        force: Literal['start'] | Literal['pause'] | None = None,
+        *args: Any,
+        **kwargs: Any,
+    ) -> bool:
+        """Returns is_playing, see `SpotipyClient.custom_toggle_playback`."""
+        if force == 'start' or force is None:
+            try:
+                await self.start_playback(*args, **kwargs)
+                return True
+            except SpotifyException:
+                if force == 'start':
+                    return True
+
+        if force == 'pause' or force is None:
+            try:
+                await self.pause_playback(*args, **kwargs)
+                return False
+            except SpotifyException:
+                if force == 'pause':
+                    return False
+
+        raise Exception('Unknown error. Maybe network issues?')
+
+    async def next_track(self, device_id: str | None = None) -> Any:
+        return await self._post('me/player/next', device_id=device_id)
+
+    async def previous_track(self, device_id: str | None = None) -> Any:
+        return await self._post('me/player/previous', device_id=device_id)
+
+    async def seek_track(self, position_ms: int, device_id: str | None = None) -> Any:
+        return await self._put('me/player/seek', position_ms=position_ms, device_id=device_id)
+
+    async def repeat(
+        self,
+        state: Literal['track'] | Literal['context'] | Literal['off'],
+        device_id: str | None = None,
+    ) -> Any:
+        return await self._put('me/player/repeat', state=state, device_id=device_id)
+
+    async def volume(self, volume_percent: int, device_id: str | None = None) -> Any:
+        return await self._put('me/player/volume', volume_percent=volume_percent, device_id=device_id)
+
+    async def shuffle(self, state: bool, device_id: str | None = None) -> Any:
+        return await self._put('me/player/shuffle', state=str(state).lower(), device_id=device_id)
+
+    async def queue(self) -> Any:
+        return await self._get('me/player/queue')
+
+    async def add_to_queue(self, uri: str, device_id: str | None = None) -> Any:
+        return await self._post('me/player/queue', uri=spotify_uri(uri), device_id=device_id)
+
+    async def available_markets(self) -> Any:
+        return await self._get('markets')
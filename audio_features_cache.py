@@ -0,0 +1,47 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Iterable
+
+DEFAULT_PATH = '.cache-audio-features.sqlite'
+
+
+class AudioFeaturesCache:
+    """
+    Persistent cache of raw audio features responses keyed by track ID.
+    Audio features of a track never change, so entries never expire.
+    Thread safe: one SQLite connection is shared by all threads and every read or write holds `lock`.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS audio_features (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        self.connection.commit()
+
+    def get_many(self, ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+        ids = list(ids)
+        found: dict[str, dict[str, Any]] = {}
+        # Stay below SQLite's limit of host parameters per statement.
+        with self.lock:
+            for i in range(0, len(ids), 500):
+                window = ids[i:i + 500]
+                placeholders = ','.join('?' * len(window))
+                rows = self.connection.execute(
+                    f'SELECT id, data FROM audio_features WHERE id IN ({placeholders})',
+                    window,
+                ).fetchall()
+                found.update((track_id, json.loads(data)) for track_id, data in rows)
+        return found
+
+    def put_many(self, features: Iterable[dict[str, Any]]) -> None:
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO audio_features (id, data) VALUES (?, ?)',
+                ((data['id'], json.dumps(data)) for data in features),
+            )
+            self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,63 @@
+"""
+Time to turn response bodies into `mytypes.types` objects, per decoding path:
+
+    json + cls(**data)   what SpotipyClient does by default: spotipy parses the body, __post_init__ rebuilds children
+    json + fast          the compiled decoders of `mytypes.decode.fast` on the standard library parser
+    loads + fast         SpotipyClient(fast=True): `mytypes.decode.loads` (orjson if installed) and compiled decoders
+
+Usage: python -m benchmarks.decode [repeat]
+"""
+import sys
+import json
+import timeit
+from typing import Any, Callable
+
+from benchmarks import synthetic
+from mytypes.decode import fast, loads
+from mytypes.types import (
+    AudioFeaturesObject,
+    PagedPlaylistTrackObject,
+    PagedSimplifiedEpisodeObject,
+    PlaybackState,
+    PlaylistObject,
+    SetOfAudioFeaturesObject,
+)
+
+AUDIO_FEATURES = [synthetic.audio_features(i) for i in range(100)]
+
+CASES: list[tuple[str, type, dict[str, Any]]] = [
+    ('playlist', PlaylistObject, synthetic.playlist(100)),
+    ('playlist_items', PagedPlaylistTrackObject, synthetic.playlist_tracks_page(100)),
+    ('show_episodes', PagedSimplifiedEpisodeObject, synthetic.show_episodes_page(50)),
+    ('audio_features', SetOfAudioFeaturesObject, dict(audio_features=AUDIO_FEATURES)),
+    ('current_playback', PlaybackState, synthetic.playback_state()),
+]
+
+
+def paths(cls: type) -> dict[str, Callable[[bytes], Any]]:
+    return {
+        'json + cls(**data)': lambda body: cls(**json.loads(body)),
+        'json + fast': lambda body: fast(cls, json.loads(body)),
+        'loads + fast': lambda body: fast(cls, loads(body)),
+    }
+
+
+def main(repeat: int = 200) -> None:
+    print(f'parser: {loads.__module__}, best of 5 x {repeat}\n')
+    names = list(paths(object))
+    print(f'{"endpoint":<18} {"KiB":>6} ' + ' '.join(f'{name:>20}' for name in names) + f' {"speedup":>8}')
+    for endpoint, cls, data in CASES:
+        body = json.dumps(data).encode()
+        # Both paths must build the same objects.
+        assert fast(cls, body) == cls(**json.loads(body)), endpoint
+        timings = [
+            min(timeit.repeat(lambda: decode(body), number=repeat, repeat=5)) / repeat for decode in paths(cls).values()
+        ]
+        print(
+            f'{endpoint:<18} {len(body) / 1024:>6.1f} ' + ' '.join(f'{t * 1000:>17.3f} ms' for t in timings) +
+            f' {timings[0] / timings[-1]:>7.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
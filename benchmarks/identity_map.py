@@ -0,0 +1,58 @@
+"""
+Time and memory to decode a large synthetic playlist with and without an identity map, per decoding path.
+
+Usage: python -m benchmarks.identity_map [n_tracks]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Any, Callable
+
+from benchmarks import synthetic
+from mytypes.decode import fast
+from mytypes.identity import IdentityMap
+from mytypes.types import PagedPlaylistTrackObject
+
+DECODERS: dict[str, Callable[[dict[str, Any]], Any]] = {
+    'eager': lambda data: PagedPlaylistTrackObject(**data),
+    'fast': lambda data: fast(PagedPlaylistTrackObject, data),
+}
+
+
+def measure(
+    decode: Callable[[dict[str, Any]], Any],
+    pages: list[dict[str, Any]],
+    identity_map: IdentityMap | None,
+) -> tuple[float, int]:
+    """Seconds to decode `pages` and bytes held by the result."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with identity_map.active() if identity_map is not None else nullcontext():
+        parsed = [decode(data) for data in pages]
+    duration = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return duration, size
+
+
+def main(n_tracks: int = 10_000) -> None:
+    pages = [synthetic.playlist_tracks_page(n_tracks, offset=offset) for offset in range(0, n_tracks, 100)]
+    print(f'{n_tracks} tracks, {synthetic.N_ALBUMS} albums, {synthetic.N_ARTISTS} artists\n')
+    print(f'{"decoder":<8} {"plain s":>8} {"map s":>8} {"plain MiB":>10} {"map MiB":>8} {"shared":>8}')
+    for name, decode in DECODERS.items():
+        plain_s, plain_size = measure(decode, pages, None)
+        identity_map = IdentityMap()
+        map_s, map_size = measure(decode, pages, identity_map)
+        print(
+            f'{name:<8} {plain_s:>8.3f} {map_s:>8.3f} {plain_size / 2**20:>10.1f} {map_size / 2**20:>8.1f} '
+            f'{identity_map.hits:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""
+Memory saved by the slotted dataclasses in `mytypes.types` on a large synthetic playlist.
+
+Every object in the parsed model is compared to an equivalent object that keeps the same
+attributes in a per-instance __dict__, which is what a plain dataclass does.
+
+Usage: python -m benchmarks.memory_slots [n_tracks]
+"""
+import sys
+import tracemalloc
+from collections import defaultdict
+from dataclasses import fields, is_dataclass
+from typing import Any, Iterator
+
+from benchmarks import synthetic
+from mytypes.types import PagedPlaylistTrackObject
+
+
+class _Plain:
+    """Stand-in for an instance that stores its fields in a __dict__."""
+
+
+def dict_size(obj: Any) -> int:
+    """Size in bytes of `obj` if its fields were stored in a __dict__ instead of slots."""
+    plain = _Plain()
+    plain.__dict__.update((f.name, getattr(obj, f.name)) for f in fields(obj))
+    return sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)
+
+
+def walk(obj: Any) -> Iterator[Any]:
+    """All dataclass instances reachable from `obj`, each distinct object once."""
+    seen: set[int] = set()
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if is_dataclass(current):
+            yield current
+            stack.extend(getattr(current, f.name) for f in fields(current))
+        elif isinstance(current, list):
+            stack.extend(current)
+
+
+def main(n_tracks: int = 10_000) -> None:
+    pages = [synthetic.playlist_tracks_page(n_tracks, offset=offset) for offset in range(0, n_tracks, 100)]
+
+    tracemalloc.start()
+    parsed = [PagedPlaylistTrackObject(**data) for data in pages]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts: dict[str, int] = defaultdict(int)
+    slotted: dict[str, int] = defaultdict(int)
+    with_dict: dict[str, int] = defaultdict(int)
+    for obj in walk(parsed):
+        name = type(obj).__name__
+        counts[name] += 1
+        slotted[name] += sys.getsizeof(obj)
+        with_dict[name] += dict_size(obj)
+
+    print(f'{n_tracks} tracks, parse peak {peak / 2**20:.1f} MiB\n')
+    print(f'{"class":<26} {"objects":>9} {"slots B/obj":>12} {"dict B/obj":>11} {"saved B/obj":>12} {"saved MiB":>10}')
+    for name in sorted(counts, key=lambda name: with_dict[name] - slotted[name], reverse=True):
+        saved = with_dict[name] - slotted[name]
+        print(
+            f'{name:<26} {counts[name]:>9} {slotted[name] / counts[name]:>12.0f} '
+            f'{with_dict[name] / counts[name]:>11.0f} {saved / counts[name]:>12.0f} {saved / 2**20:>10.2f}'
+        )
+    total_slotted, total_dict = sum(slotted.values()), sum(with_dict.values())
+    print(
+        f'\ntotal {total_slotted / 2**20:.1f} MiB with slots, {total_dict / 2**20:.1f} MiB with __dict__, '
+        f'{1 - total_slotted / total_dict:.0%} saved'
+    )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,274 @@
+"""
+Benchmark suite for the hot paths: parsing the response model, and the copy and sort jobs end to end
+against `benchmarks.stub_server`. Each benchmark reports the best time of a few runs and the peak memory
+allocated by one run, and is compared to a JSON baseline so that regressions show up immediately.
+
+    python -m benchmarks.run --save          # record a baseline on this machine
+    python -m benchmarks.run                 # compare to it, exits with 1 on a regression
+    python -m benchmarks.run --filter parse  # only benchmarks whose name contains 'parse'
+
+Baselines depend on the machine, so they are not checked in.
+"""
+import io
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from pathlib import Path
+from dataclasses import asdict, dataclass
+from contextlib import redirect_stdout
+from typing import Any, Callable
+
+from benchmarks import synthetic
+from benchmarks.stub_server import StubConfig, StubServer
+from mytypes.decode import fast
+from mytypes.types import AudioFeaturesObject, PagedPlaylistTrackObject, PlaybackState, PlaylistObject
+from spotipy_client import SpotipyClient
+from http_session import build_session
+from rate_limit import UnpacedScheduler
+import discover_weekly
+import bpm
+import tae
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+DEFAULT_REPEAT = 5
+# Slower or bigger than the baseline by more than this fraction is a regression.
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+
+SIZES = {'100': 100, '1k': 1_000, '10k': 10_000}
+E2E_TRACKS = 500
+E2E_EPISODES = 200
+
+# A benchmark builds its inputs and returns the function to measure, which runs `number` times per repeat.
+Setup = Callable[[], Callable[[], Any]]
+
+
+@dataclass(kw_only=True)
+class Benchmark:
+    name: str
+    setup: Setup
+    number: int = 1
+    # Run `setup` again before every repeat, for jobs that change their inputs.
+    fresh_setup: bool = False
+
+
+@dataclass(kw_only=True)
+class Result:
+    seconds: float  # Per call, best of the repeats.
+    peak_bytes: int  # Peak of memory allocated during one call.
+
+
+def parse_benchmarks() -> list[Benchmark]:
+    benchmarks = []
+    for size, n_tracks in SIZES.items():
+        # One playlist with all tracks embedded, and the same tracks as pages of 100.
+        playlist = synthetic.playlist(0)
+        playlist['tracks'] = synthetic.playlist_tracks_page(n_tracks, limit=n_tracks)
+        pages = [synthetic.playlist_tracks_page(n_tracks, offset=offset) for offset in range(0, n_tracks, 100)]
+        # Default arguments bind the data of this size.
+        benchmarks += [
+            Benchmark(
+                name=f'parse.playlist.{size}',
+                setup=lambda data=playlist: lambda: PlaylistObject(**data),
+            ),
+            Benchmark(
+                name=f'parse.playlist.{size}.fast',
+                setup=lambda data=playlist: lambda: fast(PlaylistObject, data),
+            ),
+            Benchmark(
+                name=f'parse.playlist_items.{size}',
+                setup=lambda pages=pages: lambda: [PagedPlaylistTrackObject(**data) for data in pages],
+            ),
+            Benchmark(
+                name=f'parse.playlist_items.{size}.fast',
+                setup=lambda pages=pages: lambda: [fast(PagedPlaylistTrackObject, data) for data in pages],
+            ),
+        ]
+
+    features = [synthetic.audio_features(i) for i in range(1_000)]
+    state = synthetic.playback_state()
+    benchmarks += [
+        Benchmark(
+            name='parse.audio_features.1k',
+            setup=lambda: lambda: [AudioFeaturesObject(**data) for data in features],
+        ),
+        Benchmark(
+            name='parse.audio_features.1k.fast',
+            setup=lambda: lambda: [fast(AudioFeaturesObject, data) for data in features],
+        ),
+        Benchmark(name='parse.playback_state', setup=lambda: lambda: PlaybackState(**state), number=1_000),
+        Benchmark(name='parse.playback_state.fast', setup=lambda: lambda: fast(PlaybackState, state), number=1_000),
+    ]
+    return benchmarks
+
+
+def e2e(job: Callable[[SpotipyClient, StubServer], Any]) -> Setup:
+    """Run `job` with a new client against a new stub server, printing nothing."""
+
+    def setup() -> Callable[[], Any]:
+        server = StubServer(StubConfig(n_playlists=1, n_tracks=E2E_TRACKS, n_episodes=E2E_EPISODES)).start()
+        # Unpaced, so the timings measure the jobs rather than the rate limit.
+        client = SpotipyClient(
+            username='benchmark',
+            session=build_session(scheduler=UnpacedScheduler()),
+            api_prefix=server.api_prefix,
+            access_token='benchmark',
+        )
+
+        def run() -> None:
+            try:
+                with redirect_stdout(io.StringIO()):
+                    job(client, server)
+            finally:
+                server.stop()
+
+        return run
+
+    return setup
+
+
+def e2e_benchmarks() -> list[Benchmark]:
+    return [
+        Benchmark(
+            name='e2e.discover_weekly',
+            setup=e2e(
+                lambda client, server: discover_weekly.
+                duplicate_discover_weekly(client=client, name='dw', playlist_id=server.playlist_ids[0])
+            ),
+            fresh_setup=True,
+        ),
+        Benchmark(
+            name='e2e.bpm.duplicate',
+            setup=e2e(
+                lambda client, server: bpm.
+                duplicate_playlist_sorted_by_bpm(client=client, playlist=server.playlist_ids[0], threshold=100)
+            ),
+            fresh_setup=True,
+        ),
+        Benchmark(
+            name='e2e.bpm.in_place',
+            setup=e2e(
+                lambda client, server: bpm.
+                sort_playlist_by_bpm(client=client, playlist=server.playlist_ids[0], threshold=100)
+            ),
+            fresh_setup=True,
+        ),
+        Benchmark(
+            name='e2e.tae',
+            setup=e2e(
+                lambda client, server: tae.copy_show_to_playlist(
+                    client=client, show_id=synthetic.object_id('show', 0), user='benchmark', name='tae'
+                )
+            ),
+            fresh_setup=True,
+        ),
+    ]
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Result:
+    fn = benchmark.setup()
+    timings = []
+    for i in range(repeat):
+        if benchmark.fresh_setup and i:
+            fn = benchmark.setup()
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(benchmark.number):
+            fn()
+        timings.append((time.perf_counter() - start) / benchmark.number)
+
+    # Separate run, tracing allocations slows everything down.
+    if benchmark.fresh_setup:
+        fn = benchmark.setup()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(seconds=min(timings), peak_bytes=peak_bytes)
+
+
+def compare(
+    results: dict[str, Result],
+    baseline: dict[str, Result],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> list[str]:
+    """Print results next to the baseline, returns the names of regressed benchmarks."""
+    regressions = []
+    print(f'{"benchmark":<34} {"time":>10} {"baseline":>10} {"ratio":>6} {"peak MiB":>9} {"baseline":>9} {"ratio":>6}')
+    for name, result in results.items():
+        line = f'{name:<34} {_seconds(result.seconds):>10}'
+        peak = f'{result.peak_bytes / 2**20:>9.2f}'
+        if name not in baseline:
+            print(f'{line} {"-":>10} {"":>6} {peak}')
+            continue
+        time_ratio = result.seconds / baseline[name].seconds
+        memory_ratio = result.peak_bytes / max(baseline[name].peak_bytes, 1)
+        regressed = time_ratio > 1 + time_tolerance or memory_ratio > 1 + memory_tolerance
+        if regressed:
+            regressions.append(name)
+        print(
+            f'{line} {_seconds(baseline[name].seconds):>10} {time_ratio:>5.2f}x {peak} '
+            f'{baseline[name].peak_bytes / 2**20:>9.2f} {memory_ratio:>5.2f}x' + ('  REGRESSION' if regressed else '')
+        )
+    return regressions
+
+
+def _seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f} us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds:.3f} s'
+
+
+def load_baseline(path: Path) -> dict[str, Result]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    return {name: Result(**result) for name, result in data['results'].items()}
+
+
+def save_baseline(path: Path, results: dict[str, Result]) -> None:
+    # Keep the entries of benchmarks that were filtered out.
+    merged = {**load_baseline(path), **results}
+    data = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {
+            name: asdict(result)
+            for name, result in merged.items()
+        },
+    }
+    path.write_text(json.dumps(data, indent=2) + '\n')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    benchmarks = [b for b in parse_benchmarks() + e2e_benchmarks() if args.filter in b.name]
+    results = {benchmark.name: measure(benchmark, args.repeat) for benchmark in benchmarks}
+    regressions = compare(results, load_baseline(args.baseline), args.time_tolerance, args.memory_tolerance)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f'\nSaved baseline to {args.baseline}')
+    elif regressions:
+        print(f'\n{len(regressions)} regressed: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
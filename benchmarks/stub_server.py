@@ -0,0 +1,556 @@
+"""
+Local stand-in for the Spotify Web API, serving synthetic data, to run the clients and scripts offline.
+
+Implements the endpoints the clients wrap: playlists with paging, ETags and item adds, reorders, replaces
+and removals, audio features, shows and episodes, and the player with a simulated playback clock.
+Latency, 429 responses and server errors can be injected to measure how the clients cope.
+
+    with StubServer(StubConfig(n_tracks=2000, latency_s=0.05)) as server:
+        sp = SpotipyClient(api_prefix=server.api_prefix, access_token='stub')
+        sp.playlist(server.playlist_ids[0])
+
+Usage: python -m benchmarks.stub_server [--port 8765] [--tracks 500] [--latency-ms 0] [--rate-limit-every 0] ...
+"""
+import re
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import synthetic
+from utils import spotify_id
+
+DEFAULT_PORT = 8765
+PLAYLIST_PAGE_LIMIT = 100
+EPISODE_PAGE_LIMIT = 50
+AUDIO_FEATURES_LIMIT = 100
+
+FieldTree = dict[str, 'FieldTree | None']
+Handler = Callable[..., Any]
+
+
+@dataclass(kw_only=True)
+class StubConfig:
+    n_playlists: int = 3
+    n_tracks: int = 500  # Tracks in each playlist.
+    n_episodes: int = 200
+    # Added to every response, plus up to `jitter_s` at random.
+    latency_s: float = 0
+    jitter_s: float = 0
+    # Answer every nth request with 429 Too Many Requests, 0 never does.
+    rate_limit_every: int = 0
+    retry_after_s: int = 1
+    # Fraction of requests answered with 500 Internal Server Error.
+    error_rate: float = 0
+    # Length of every track played by the simulated player, the synthetic lengths if None.
+    track_duration_ms: int | None = None
+    seed: int = 0
+
+
+class StubError(Exception):
+
+    def __init__(self, status: int, message: str, headers: dict[str, str] | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def index_of(value: str) -> int:
+    """Index of the synthetic object with this ID, URI or URL."""
+    try:
+        return int(spotify_id(value)[2:])
+    except ValueError:
+        raise StubError(400, f'Invalid base62 id: {value}') from None
+
+
+def parse_fields(spec: str) -> FieldTree:
+    """
+    Parse a `fields` filter like 'name,tracks.items(track(name,artists(name)))' into a tree,
+    None selects everything below a field.
+    """
+    tree, end = _parse_fields(spec, 0)
+    if end != len(spec):
+        raise StubError(400, f'Invalid fields: {spec}')
+    return tree
+
+
+def _parse_fields(spec: str, i: int) -> tuple[FieldTree, int]:
+    tree: FieldTree = {}
+    while i < len(spec) and spec[i] != ')':
+        j = i
+        while j < len(spec) and spec[j] not in ',()':
+            j += 1
+        *parents, name = spec[i:j].split('.')
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {}) or {}
+        if j < len(spec) and spec[j] == '(':
+            node[name], j = _parse_fields(spec, j + 1)
+            if j >= len(spec) or spec[j] != ')':
+                raise StubError(400, f'Invalid fields: {spec}')
+            j += 1
+        else:
+            node[name] = None
+        i = j + 1 if j < len(spec) and spec[j] == ',' else j
+    return tree, i
+
+
+def select(data: Any, tree: FieldTree | None) -> Any:
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [select(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {name: select(data[name], subtree) for name, subtree in tree.items() if name in data}
+
+
+@dataclass(kw_only=True)
+class StubPlaylist:
+    id: str
+    name: str
+    uris: list[str]
+    version: int = 1
+
+    @property
+    def snapshot_id(self) -> str:
+        return base64.b64encode(f'{self.version},{self.id}'.encode()).decode()
+
+    def changed(self) -> dict[str, str]:
+        self.version += 1
+        return {'snapshot_id': self.snapshot_id}
+
+
+@dataclass(kw_only=True)
+class StubPlayer:
+    """A player that plays through a list of tracks in real time."""
+    uris: list[str]
+    track_duration_ms: int | None = None
+    position: int = 0
+    is_playing: bool = True
+    repeat_state: str = 'off'
+    shuffle_state: bool = False
+    volume_percent: int = 50
+    # Progress at `updated_s`.
+    progress_ms: int = 0
+    updated_s: float = field(default_factory=time.time)
+
+    def duration_ms(self, position: int) -> int:
+        if self.track_duration_ms is not None:
+            return self.track_duration_ms
+        return synthetic.track(index_of(self.uris[position]))['duration_ms']
+
+    def advance(self, now_s: float) -> None:
+        """Move the clock to `now_s`, continuing to the next tracks as they end."""
+        if self.is_playing:
+            self.progress_ms += int((now_s - self.updated_s) * 1000)
+        self.updated_s = now_s
+        while self.progress_ms >= self.duration_ms(self.position):
+            self.progress_ms -= self.duration_ms(self.position)
+            if self.repeat_state == 'track':
+                continue
+            if self.position + 1 < len(self.uris):
+                self.position += 1
+            elif self.repeat_state == 'context':
+                self.position = 0
+            else:
+                self.progress_ms, self.is_playing = 0, False
+
+    def state(self, now_s: float) -> dict[str, Any]:
+        self.advance(now_s)
+        track_data = synthetic.track(index_of(self.uris[self.position]))
+        if self.track_duration_ms is not None:
+            track_data['duration_ms'] = self.track_duration_ms
+        data = synthetic.playback_state(
+            track_data=track_data,
+            progress_ms=self.progress_ms,
+            is_playing=self.is_playing,
+            timestamp=int(now_s * 1000),
+            repeat_state=self.repeat_state,
+            shuffle_state=self.shuffle_state,
+        )
+        data['device']['volume_percent'] = self.volume_percent
+        return data
+
+    def skip(self, now_s: float, step: int) -> None:
+        self.advance(now_s)
+        self.position = (self.position + step) % len(self.uris)
+        self.progress_ms = 0
+
+
+class StubApi:
+    """The data behind the stub server and the handlers of its endpoints."""
+
+    def __init__(self, config: StubConfig, base_url: str) -> None:
+        self.config = config
+        self.base_url = base_url
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.n_requests = 0
+        self.playlists: dict[str, StubPlaylist] = {}
+        for i in range(config.n_playlists):
+            tracks = range(i * config.n_tracks, (i + 1) * config.n_tracks)
+            self.add_playlist(f'Synthetic {i}', [synthetic.track(t)['uri'] for t in tracks])
+        first = next(iter(self.playlists.values()))
+        self.player = StubPlayer(uris=list(first.uris), track_duration_ms=config.track_duration_ms)
+
+        # Handlers return a response body, None for 204 No Content, or (status, body, headers).
+        self.routes: list[tuple[str, re.Pattern, Handler]] = [
+            ('GET', re.compile(r'playlists/(\w+)'), self.get_playlist),
+            ('GET', re.compile(r'playlists/(\w+)/(?:tracks|items)'), self.get_playlist_items),
+            ('POST', re.compile(r'playlists/(\w+)/(?:tracks|items)'), self.add_playlist_items),
+            ('PUT', re.compile(r'playlists/(\w+)/(?:tracks|items)'), self.update_playlist_items),
+            ('DELETE', re.compile(r'playlists/(\w+)/(?:tracks|items)'), self.remove_playlist_items),
+            ('PUT', re.compile(r'playlists/(\w+)'), self.change_playlist_details),
+            ('GET', re.compile(r'me/playlists'), self.get_user_playlists),
+            ('GET', re.compile(r'users/(\w+)/playlists'), self.get_user_playlists),
+            ('POST', re.compile(r'(?:me|users/\w+)/playlists'), self.create_playlist),
+            ('GET', re.compile(r'me'), lambda query, body: synthetic.user()),
+            ('GET', re.compile(r'tracks/(\w+)'), lambda query, body, id: synthetic.track(index_of(id))),
+            ('GET', re.compile(r'tracks'), self.get_tracks),
+            (
+                'GET', re.compile(r'audio-features/(\w+)'),
+                lambda query, body, id: synthetic.audio_features(index_of(id))
+            ),
+            ('GET', re.compile(r'audio-features'), self.get_audio_features),
+            ('GET', re.compile(r'shows/(\w+)'), self.get_show),
+            ('GET', re.compile(r'shows/(\w+)/episodes'), self.get_show_episodes),
+            ('GET', re.compile(r'episodes/(\w+)'), lambda query, body, id: synthetic.episode(index_of(id))),
+            ('GET', re.compile(r'me/player'), self.get_playback),
+            ('GET', re.compile(r'me/player/currently-playing'), self.get_playback),
+            ('GET', re.compile(r'me/player/devices'), lambda query, body: {
+                'devices': [synthetic.device()]
+            }),
+            ('PUT', re.compile(r'me/player/play'), self.start_playback),
+            ('PUT', re.compile(r'me/player/pause'), self.pause_playback),
+            ('POST', re.compile(r'me/player/next'), lambda query, body: self.player.skip(time.time(), 1)),
+            ('POST', re.compile(r'me/player/previous'), lambda query, body: self.player.skip(time.time(), -1)),
+            ('PUT', re.compile(r'me/player/seek'), self.seek),
+            ('PUT', re.compile(r'me/player/repeat'), self.set_repeat),
+            ('PUT', re.compile(r'me/player/shuffle'), self.set_shuffle),
+            ('PUT', re.compile(r'me/player/volume'), self.set_volume),
+        ]
+
+    def handle(self, method: str, path: str, query: dict[str, str], body: Any) -> tuple[int, Any, dict[str, str]]:
+        """Status, JSON body and headers of the response."""
+        self.inject_faults()
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if route_method == method and match:
+                with self.lock:
+                    result = handler(query, body, *match.groups())
+                if isinstance(result, tuple):
+                    return result
+                return (200, result, {}) if result is not None else (204, None, {})
+        raise StubError(404, f'Service not found: {method} {path}')
+
+    def inject_faults(self) -> None:
+        with self.lock:
+            self.n_requests += 1
+            n_requests = self.n_requests
+            delay_s = self.config.latency_s + self.random.uniform(0, self.config.jitter_s)
+            is_error = self.random.random() < self.config.error_rate
+        if delay_s:
+            time.sleep(delay_s)
+        if self.config.rate_limit_every and n_requests % self.config.rate_limit_every == 0:
+            raise StubError(429, 'API rate limit exceeded', {'Retry-After': str(self.config.retry_after_s)})
+        if is_error:
+            raise StubError(500, 'Server error')
+
+    def add_playlist(self, name: str, uris: list[str]) -> StubPlaylist:
+        playlist = StubPlaylist(id=synthetic.object_id('playlist', len(self.playlists)), name=name, uris=uris)
+        self.playlists[playlist.id] = playlist
+        return playlist
+
+    def _playlist(self, playlist_id: str) -> StubPlaylist:
+        if playlist_id not in self.playlists:
+            raise StubError(404, 'Not found.')
+        return self.playlists[playlist_id]
+
+    def _items_page(self, playlist: StubPlaylist, offset: int, limit: int) -> dict[str, Any]:
+        items = [
+            synthetic.playlist_track(0, synthetic.track(index_of(uri))) for uri in playlist.uris[offset:offset + limit]
+        ]
+        href = f'{self.base_url}playlists/{playlist.id}/tracks'
+        return synthetic.page(items, href=href, limit=limit, offset=offset, total=len(playlist.uris))
+
+    def _playlist_data(self, playlist: StubPlaylist, items: bool = True) -> dict[str, Any]:
+        data = synthetic.playlist(0, playlist_id=playlist.id, name=playlist.name)
+        data['href'] = f'{self.base_url}playlists/{playlist.id}'
+        data['snapshot_id'] = playlist.snapshot_id
+        if items:
+            data['tracks'] = self._items_page(playlist, 0, PLAYLIST_PAGE_LIMIT)
+        else:
+            data['tracks'] = {'href': f'{data["href"]}/tracks', 'total': len(playlist.uris)}
+        return data
+
+    def get_playlist(self, query: dict[str, str], body: Any, playlist_id: str) -> tuple[int, Any, dict[str, str]]:
+        playlist = self._playlist(playlist_id)
+        etag = f'"{playlist.snapshot_id}"'
+        if query.get('if-none-match') == etag:
+            return 304, None, {'ETag': etag}
+        data = self._playlist_data(playlist)
+        if 'fields' in query:
+            data = select(data, parse_fields(query['fields']))
+        return 200, data, {'ETag': etag}
+
+    def get_playlist_items(self, query: dict[str, str], body: Any, playlist_id: str) -> dict[str, Any]:
+        offset, limit = _paging(query, PLAYLIST_PAGE_LIMIT)
+        data = self._items_page(self._playlist(playlist_id), offset, limit)
+        return select(data, parse_fields(query['fields'])) if 'fields' in query else data
+
+    def add_playlist_items(self, query: dict[str, str], body: Any, playlist_id: str) -> tuple[int, Any, dict[str, str]]:
+        playlist = self._playlist(playlist_id)
+        uris = body if isinstance(body, list) else body.get('uris', [])
+        position = query.get('position', body.get('position') if isinstance(body, dict) else None)
+        if len(uris) > PLAYLIST_PAGE_LIMIT:
+            raise StubError(400, 'Too many ids requested')
+        for uri in uris:
+            index_of(uri)
+        position = len(playlist.uris) if position is None else int(position)
+        playlist.uris[position:position] = uris
+        return 201, playlist.changed(), {}
+
+    def update_playlist_items(self, query: dict[str, str], body: Any, playlist_id: str) -> dict[str, str]:
+        playlist = self._playlist(playlist_id)
+        if 'uris' in body:
+            if len(body['uris']) > PLAYLIST_PAGE_LIMIT:
+                raise StubError(400, 'Too many ids requested')
+            playlist.uris = list(body['uris'])
+            return playlist.changed()
+        start, length, insert_before = body['range_start'], body.get('range_length', 1), body['insert_before']
+        if not 0 <= start < start + length <= len(playlist.uris) or not 0 <= insert_before <= len(playlist.uris):
+            raise StubError(400, 'Invalid range')
+        block = playlist.uris[start:start + length]
+        del playlist.uris[start:start + length]
+        position = insert_before - length if insert_before > start else insert_before
+        playlist.uris[position:position] = block
+        return playlist.changed()
+
+    def remove_playlist_items(self, query: dict[str, str], body: Any, playlist_id: str) -> dict[str, str]:
+        playlist = self._playlist(playlist_id)
+        removed = {spotify_id(item['uri']) for item in body.get('items', body.get('tracks', []))}
+        playlist.uris = [uri for uri in playlist.uris if spotify_id(uri) not in removed]
+        return playlist.changed()
+
+    def change_playlist_details(self, query: dict[str, str], body: Any, playlist_id: str) -> None:
+        playlist = self._playlist(playlist_id)
+        playlist.name = body.get('name', playlist.name)
+
+    def get_user_playlists(self, query: dict[str, str], body: Any, user: str | None = None) -> dict[str, Any]:
+        offset, limit = _paging(query, 50)
+        playlists = list(self.playlists.values())
+        items = [self._playlist_data(playlist, items=False) for playlist in playlists[offset:offset + limit]]
+        # Simplified playlist objects, like the real API.
+        for item in items:
+            del item['followers'], item['primary_color']
+        return synthetic.page(
+            items, href=f'{self.base_url}me/playlists', limit=limit, offset=offset, total=len(playlists)
+        )
+
+    def create_playlist(self, query: dict[str, str], body: Any) -> tuple[int, Any, dict[str, str]]:
+        playlist = self.add_playlist(body['name'], [])
+        return 201, self._playlist_data(playlist), {}
+
+    def get_tracks(self, query: dict[str, str], body: Any) -> dict[str, Any]:
+        return {'tracks': [synthetic.track(index_of(id)) for id in _ids(query, 50)]}
+
+    def get_audio_features(self, query: dict[str, str], body: Any) -> dict[str, Any]:
+        # Like Spotify, null for IDs that are not tracks.
+        features = [
+            synthetic.audio_features(index_of(id)) if spotify_id(id).startswith('tr') else None
+            for id in _ids(query, AUDIO_FEATURES_LIMIT)
+        ]
+        return {'audio_features': features}
+
+    def get_show(self, query: dict[str, str], body: Any, show_id: str) -> dict[str, Any]:
+        data = synthetic.show(self.config.n_episodes, show_id=show_id)
+        data['episodes'] = self.get_show_episodes({}, None, show_id)
+        return data
+
+    def get_show_episodes(self, query: dict[str, str], body: Any, show_id: str) -> dict[str, Any]:
+        offset, limit = _paging(query, EPISODE_PAGE_LIMIT)
+        items = [synthetic.episode(i) for i in range(offset, min(offset + limit, self.config.n_episodes))]
+        href = f'{self.base_url}shows/{show_id}/episodes'
+        return synthetic.page(items, href=href, limit=limit, offset=offset, total=self.config.n_episodes)
+
+    def get_playback(self, query: dict[str, str], body: Any) -> dict[str, Any]:
+        return self.player.state(time.time())
+
+    def start_playback(self, query: dict[str, str], body: Any) -> None:
+        now_s = time.time()
+        self.player.advance(now_s)
+        body = body or {}
+        if 'context_uri' in body:
+            self.player.uris = list(self._playlist(spotify_id(body['context_uri'])).uris)
+        elif 'uris' in body:
+            self.player.uris = list(body['uris'])
+        if 'context_uri' in body or 'uris' in body:
+            self.player.position = body.get('offset', {}).get('position', 0)
+            self.player.progress_ms = 0
+        if 'position_ms' in body:
+            self.player.progress_ms = body['position_ms']
+        self.player.is_playing = True
+
+    def pause_playback(self, query: dict[str, str], body: Any) -> None:
+        self.player.advance(time.time())
+        if not self.player.is_playing:
+            raise StubError(403, 'Player command failed: Restriction violated')
+        self.player.is_playing = False
+
+    def seek(self, query: dict[str, str], body: Any) -> None:
+        self.player.advance(time.time())
+        self.player.progress_ms = int(query['position_ms'])
+
+    def set_repeat(self, query: dict[str, str], body: Any) -> None:
+        self.player.advance(time.time())
+        self.player.repeat_state = query['state']
+
+    def set_shuffle(self, query: dict[str, str], body: Any) -> None:
+        self.player.shuffle_state = query['state'] == 'true'
+
+    def set_volume(self, query: dict[str, str], body: Any) -> None:
+        self.player.volume_percent = int(query['volume_percent'])
+
+
+def _paging(query: dict[str, str], max_limit: int) -> tuple[int, int]:
+    offset, limit = int(query.get('offset', 0)), int(query.get('limit', max_limit))
+    if not 0 < limit <= max_limit:
+        raise StubError(400, 'Invalid limit')
+    return offset, limit
+
+
+def _ids(query: dict[str, str], max_ids: int) -> list[str]:
+    ids = [id for id in query.get('ids', '').split(',') if id]
+    if not ids or len(ids) > max_ids:
+        raise StubError(400, 'Too many ids requested' if ids else 'Missing ids')
+    return ids
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: 'StubServer'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self.respond('GET')
+
+    def do_POST(self) -> None:
+        self.respond('POST')
+
+    def do_PUT(self) -> None:
+        self.respond('PUT')
+
+    def do_DELETE(self) -> None:
+        self.respond('DELETE')
+
+    def respond(self, method: str) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        path = url.path.strip('/').removeprefix('v1').strip('/')
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if etag := self.headers.get('If-None-Match'):
+            query['if-none-match'] = etag
+        try:
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                raise StubError(401, 'No token provided')
+            body = json.loads(raw_body) if raw_body else None
+            status, data, headers = self.server.api.handle(method, path, query, body)
+        except StubError as e:
+            status, data, headers = e.status, {'error': {'status': e.status, 'message': e.message}}, e.headers
+        except (KeyError, TypeError, ValueError) as e:
+            status, data, headers = 400, {'error': {'status': 400, 'message': f'Bad request: {e!r}'}}, {}
+
+        content = json.dumps(data).encode() if data is not None else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if content:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """`StubApi` served over HTTP on a background thread, port 0 picks a free port."""
+
+    daemon_threads = True
+
+    def __init__(self, config: StubConfig | None = None, host: str = '127.0.0.1', port: int = 0) -> None:
+        super().__init__((host, port), StubHandler)
+        self.api = StubApi(config or StubConfig(), base_url=self.api_prefix)
+        self.thread: threading.Thread | None = None
+
+    @property
+    def api_prefix(self) -> str:
+        """Pass as `api_prefix` to the clients."""
+        host, port = self.server_address[:2]
+        # AF_INET addresses are (str, int), the socketserver stubs allow bytes for other families.
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f'http://{host}:{port}/v1/'
+
+    @property
+    def playlist_ids(self) -> list[str]:
+        return list(self.api.playlists)
+
+    def start(self) -> 'StubServer':
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--playlists', type=int, default=StubConfig.n_playlists)
+    parser.add_argument('--tracks', type=int, default=StubConfig.n_tracks, help='tracks per playlist')
+    parser.add_argument('--episodes', type=int, default=StubConfig.n_episodes)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='answer every nth request with 429')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 500')
+    parser.add_argument('--track-duration-ms', type=int, default=None)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        n_playlists=args.playlists,
+        n_tracks=args.tracks,
+        n_episodes=args.episodes,
+        latency_s=args.latency_ms / 1000,
+        jitter_s=args.jitter_ms / 1000,
+        rate_limit_every=args.rate_limit_every,
+        error_rate=args.error_rate,
+        track_duration_ms=args.track_duration_ms,
+    )
+    server = StubServer(config, port=args.port)
+    print(f'Serving on {server.api_prefix}, playlists: {", ".join(server.playlist_ids)}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
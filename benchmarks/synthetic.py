@@ -0,0 +1,281 @@
+"""
+Synthetic API responses shaped like the Spotify Web API, for benchmarks and the stub server.
+Objects are derived from an index, so the same index always gives the same object.
+Tracks share albums and artists the way real playlists do.
+"""
+from typing import Any
+
+N_ALBUMS = 500
+N_ARTISTS = 200
+
+
+def object_id(kind: str, i: int) -> str:
+    # Spotify IDs are 22 characters of base62.
+    return f'{kind[:2]}{i:020d}'
+
+
+def _external_urls(kind: str, i: int) -> dict[str, Any]:
+    return {'spotify': f'https://open.spotify.com/{kind}/{object_id(kind, i)}'}
+
+
+def image(i: int, size: int = 640) -> dict[str, Any]:
+    return {'height': size, 'width': size, 'url': f'https://i.scdn.co/image/{i:036x}{size:04x}'}
+
+
+def artist(i: int) -> dict[str, Any]:
+    return {
+        'external_urls': _external_urls('artist', i),
+        'href': f'https://api.spotify.com/v1/artists/{object_id("artist", i)}',
+        'id': object_id('artist', i),
+        'name': f'Artist {i}',
+        'type': 'artist',
+        'uri': f'spotify:artist:{object_id("artist", i)}',
+    }
+
+
+def album(i: int) -> dict[str, Any]:
+    return {
+        'album_type': 'album',
+        'available_markets': ['NO', 'SE', 'DK', 'FI', 'US', 'GB'],
+        'external_urls': _external_urls('album', i),
+        'total_tracks': 12,
+        'href': f'https://api.spotify.com/v1/albums/{object_id("album", i)}',
+        'id': object_id('album', i),
+        'images': [image(i, 640), image(i, 300), image(i, 64)],
+        'name': f'Album {i}',
+        'release_date': f'{1960 + i % 60}-01-01',
+        'release_date_precision': 'day',
+        'type': 'album',
+        'uri': f'spotify:album:{object_id("album", i)}',
+        'artists': [artist(i % N_ARTISTS)],
+    }
+
+
+def track(i: int) -> dict[str, Any]:
+    return {
+        'album': album(i % N_ALBUMS),
+        'artists': [artist(i % N_ARTISTS), artist((i * 7 + 1) % N_ARTISTS)],
+        'available_markets': ['NO', 'SE', 'DK', 'FI', 'US', 'GB'],
+        'disc_number': 1,
+        'duration_ms': 150_000 + (i * 7919) % 150_000,
+        'explicit': False,
+        'external_ids': {
+            'isrc': f'NO{i:010d}'
+        },
+        'external_urls': _external_urls('track', i),
+        'href': f'https://api.spotify.com/v1/tracks/{object_id("track", i)}',
+        'id': object_id('track', i),
+        'is_local': False,
+        'name': f'Track {i}',
+        'popularity': i % 100,
+        'preview_url': f'https://p.scdn.co/mp3-preview/{i:040x}',
+        'track_number': i % 12 + 1,
+        'type': 'track',
+        'uri': f'spotify:track:{object_id("track", i)}',
+        'track': True,
+        'episode': False,
+    }
+
+
+def user(name: str = 'synthetic') -> dict[str, Any]:
+    return {
+        'external_urls': {
+            'spotify': f'https://open.spotify.com/user/{name}'
+        },
+        'href': f'https://api.spotify.com/v1/users/{name}',
+        'id': name,
+        'type': 'user',
+        'uri': f'spotify:user:{name}',
+    }
+
+
+def playlist_track(i: int, track_data: dict[str, Any] | None = None) -> dict[str, Any]:
+    return {
+        'added_at': '2023-01-01T00:00:00Z',
+        'added_by': user(),
+        'is_local': False,
+        'primary_color': None,
+        'track': track_data or track(i),
+        'video_thumbnail': {
+            'url': None
+        },
+    }
+
+
+def page(
+    items: list[dict[str, Any]],
+    href: str,
+    limit: int,
+    offset: int,
+    total: int,
+) -> dict[str, Any]:
+    next_offset = offset + limit
+    return {
+        'href': f'{href}?offset={offset}&limit={limit}',
+        'limit': limit,
+        'offset': offset,
+        'total': total,
+        'items': items,
+        'next': f'{href}?offset={next_offset}&limit={limit}' if next_offset < total else None,
+        'previous': f'{href}?offset={max(offset - limit, 0)}&limit={limit}' if offset else None,
+    }
+
+
+def playlist_tracks_page(
+    n_tracks: int,
+    offset: int = 0,
+    limit: int = 100,
+    playlist_id: str = 'synthetic',
+) -> dict[str, Any]:
+    href = f'https://api.spotify.com/v1/playlists/{playlist_id}/tracks'
+    items = [playlist_track(i) for i in range(offset, min(offset + limit, n_tracks))]
+    return page(items, href=href, limit=limit, offset=offset, total=n_tracks)
+
+
+def playlist(n_tracks: int, playlist_id: str = 'synthetic', name: str = 'Synthetic') -> dict[str, Any]:
+    """A playlist as returned by GET /playlists/{id}, with the first page of `n_tracks` tracks embedded."""
+    return {
+        'collaborative': False,
+        'description': '',
+        'external_urls': {
+            'spotify': f'https://open.spotify.com/playlist/{playlist_id}'
+        },
+        'href': f'https://api.spotify.com/v1/playlists/{playlist_id}',
+        'id': playlist_id,
+        'images': [image(0)],
+        'name': name,
+        'owner': {
+            **user(), 'display_name': 'Synthetic'
+        },
+        'public': False,
+        'snapshot_id': 'MSwwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAw',
+        'tracks': playlist_tracks_page(n_tracks, playlist_id=playlist_id),
+        'type': 'playlist',
+        'uri': f'spotify:playlist:{playlist_id}',
+        'followers': {
+            'href': None,
+            'total': 0
+        },
+        'primary_color': None,
+    }
+
+
+def audio_features(i: int) -> dict[str, Any]:
+    return {
+        'acousticness': (i * 13 % 100) / 100,
+        'analysis_url': f'https://api.spotify.com/v1/audio-analysis/{object_id("track", i)}',
+        'danceability': (i * 17 % 100) / 100,
+        'duration_ms': 150_000 + (i * 7919) % 150_000,
+        'energy': (i * 19 % 100) / 100,
+        'id': object_id('track', i),
+        'instrumentalness': (i * 23 % 100) / 100,
+        'key': i % 12,
+        'liveness': (i * 29 % 100) / 100,
+        'loudness': -(i % 30),
+        'mode': i % 2,
+        'speechiness': (i * 31 % 100) / 100,
+        'tempo': 60 + (i * 37 % 14000) / 100,
+        'time_signature': 4,
+        'track_href': f'https://api.spotify.com/v1/tracks/{object_id("track", i)}',
+        'type': 'audio_features',
+        'uri': f'spotify:track:{object_id("track", i)}',
+        'valence': (i * 41 % 100) / 100,
+    }
+
+
+def episode(i: int) -> dict[str, Any]:
+    return {
+        'description': f'Episode {i}',
+        'html_description': f'<p>Episode {i}</p>',
+        'duration_ms': 3_600_000,
+        'explicit': False,
+        'external_urls': _external_urls('episode', i),
+        'href': f'https://api.spotify.com/v1/episodes/{object_id("episode", i)}',
+        'id': object_id('episode', i),
+        'images': [image(i, 640), image(i, 300), image(i, 64)],
+        'is_externally_hosted': False,
+        'is_playable': True,
+        'language': 'en',
+        'languages': ['en'],
+        'name': f'Episode {i}',
+        'release_date': f'{2000 + i // 365 % 30}-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}',
+        'release_date_precision': 'day',
+        'type': 'episode',
+        'uri': f'spotify:episode:{object_id("episode", i)}',
+        'audio_preview_url': None,
+    }
+
+
+def show_episodes_page(n_episodes: int, offset: int = 0, limit: int = 50, show_id: str = 'synthetic') -> dict[str, Any]:
+    href = f'https://api.spotify.com/v1/shows/{show_id}/episodes'
+    items = [episode(i) for i in range(offset, min(offset + limit, n_episodes))]
+    return page(items, href=href, limit=limit, offset=offset, total=n_episodes)
+
+
+def show(n_episodes: int, show_id: str = 'synthetic') -> dict[str, Any]:
+    return {
+        'available_markets': ['NO', 'SE', 'US'],
+        'copyrights': [],
+        'description': 'Synthetic show',
+        'html_description': '<p>Synthetic show</p>',
+        'explicit': False,
+        'external_urls': {
+            'spotify': f'https://open.spotify.com/show/{show_id}'
+        },
+        'href': f'https://api.spotify.com/v1/shows/{show_id}',
+        'id': show_id,
+        'images': [image(0)],
+        'is_externally_hosted': False,
+        'languages': ['en'],
+        'media_type': 'audio',
+        'name': 'Synthetic show',
+        'publisher': 'Synthetic',
+        'type': 'show',
+        'uri': f'spotify:show:{show_id}',
+        'total_episodes': n_episodes,
+        'episodes': show_episodes_page(n_episodes, show_id=show_id),
+    }
+
+
+def device() -> dict[str, Any]:
+    return {
+        'id': 'synthetic-device',
+        'is_active': True,
+        'is_private_session': False,
+        'is_restricted': False,
+        'name': 'Synthetic speaker',
+        'type': 'Speaker',
+        'volume_percent': 50,
+        'supports_volume': True,
+    }
+
+
+def playback_state(
+    track_data: dict[str, Any] | None = None,
+    progress_ms: int = 0,
+    is_playing: bool = True,
+    timestamp: int = 0,
+    repeat_state: str = 'off',
+    shuffle_state: bool = False,
+) -> dict[str, Any]:
+    disallows = {'resuming': True} if is_playing else {'pausing': True}
+    context = {
+        'type': 'playlist',
+        'href': 'https://api.spotify.com/v1/playlists/synthetic',
+        'external_urls': _external_urls('playlist', 0),
+        'uri': f'spotify:playlist:{object_id("playlist", 0)}',
+    }
+    return {
+        'device': device(),
+        'repeat_state': repeat_state,
+        'shuffle_state': shuffle_state,
+        'timestamp': timestamp,
+        'is_playing': is_playing,
+        'currently_playing_type': 'track',
+        'actions': {
+            'disallows': disallows
+        },
+        'context': context,
+        'progress_ms': progress_ms,
+        'item': track_data or track(0),
+    }
@@ -1,14 +1,16 @@
 import os
+import numpy as np
 from utils import Scope
-from mytypes.types import AudioFeaturesObject, PlaylistObject
+from mytypes.types import PlaylistObject, PagedPlaylistTrackObject
+from mytypes.projection import Projection
 from spotipy_client import SpotipyClient
+from audio_features_cache import AudioFeaturesCache
+from audio_features_table import AudioFeaturesTable
+from reorder import apply_order
 
-
-def bpm_sorter(audio_feature: AudioFeaturesObject, threshold: int | None = None) -> float:
-    bpm = audio_feature.tempo
-    if threshold is not None and audio_feature.tempo >= threshold:
-        bpm /= 2
-    return bpm
+# Only what is needed to sort and print the tracks, not their albums, images and markets.
+PLAYLIST_FIELDS = Projection(PlaylistObject, 'id', 'name', 'snapshot_id')
+TRACK_FIELDS = Projection(PagedPlaylistTrackObject, 'items.track.uri', 'items.track.name', 'items.track.artists.name')
 
 
 def duplicate_playlist_sorted_by_bpm(
@@ -17,27 +19,30 @@ def duplicate_playlist_sorted_by_bpm(
     name: str = '',
     threshold: int | None = None,
     dry_run: bool | int = False,
+    cache: AudioFeaturesCache | None = None,
 ) -> None:
 
-    playlist: PlaylistObject = client.playlist(playlist_id=playlist)
-
-    songs_by_uris = {item.track.uri: item.track for item in playlist.tracks.items}
+    playlist: PlaylistObject = client.playlist(playlist_id=playlist, fields=PLAYLIST_FIELDS)
 
-    audio_features: list[AudioFeaturesObject] = client.audio_features(tracks=songs_by_uris.keys())
+    songs_by_uris = {
+        item.track.uri: item.track
+        for item in client.iter_playlist_items(playlist_id=playlist.id, fields=TRACK_FIELDS)
+    }
 
-    sorted_audio_features = sorted(
-        audio_features,
-        key=lambda s: bpm_sorter(audio_feature=s, threshold=threshold),
+    audio_features = AudioFeaturesTable.from_dicts(
+        client.audio_features_batched_raw(tracks=songs_by_uris.keys(), cache=cache)
     )
-    sorted_audio_features_uris = [item.uri for item in sorted_audio_features]
 
-    for i in sorted_audio_features:
-        print(i.tempo, songs_by_uris[i.uri].name)
+    sorted_audio_features = audio_features.sort_by(audio_features.folded_tempo(threshold))
+    sorted_audio_features_uris = sorted_audio_features.uris.tolist()
+
+    for uri, tempo in zip(sorted_audio_features.uris, sorted_audio_features['tempo']):
+        print(tempo, songs_by_uris[uri].name)
 
     plname = name or f'{playlist.name} - by bpm'
     if not dry_run:
-        new_pl: PlaylistObject = client.user_playlist_create(user=user, name=plname)
-        client.playlist_add_items(playlist_id=new_pl.uri, items=sorted_audio_features_uris)
+        new_pl: PlaylistObject = client.user_playlist_create(user=client.username, name=plname)
+        client.playlist_add_items_bulk(playlist_id=new_pl.uri, items=sorted_audio_features_uris)
 
     if dry_run:
         print(f'Completd dry run: {plname}')
@@ -45,6 +50,53 @@ def duplicate_playlist_sorted_by_bpm(
         print(f'Created playlist: {plname}')
 
 
+def sort_playlist_by_bpm(
+    client: SpotipyClient,
+    playlist: str,
+    threshold: int | None = None,
+    dry_run: bool | int = False,
+    cache: AudioFeaturesCache | None = None,
+    allow_rewrite: bool = False,
+) -> None:
+    """
+    Sort a playlist by bpm in place, with as few reorder calls as possible. Tracks without audio features go last.
+    allow_rewrite: see `reorder.apply_order`.
+    """
+
+    playlist: PlaylistObject = client.playlist(playlist_id=playlist, fields=PLAYLIST_FIELDS)
+
+    items = list(client.iter_playlist_items(playlist_id=playlist.id, fields=TRACK_FIELDS))
+    uris = [item.track.uri for item in items]
+
+    audio_features = AudioFeaturesTable.from_dicts(
+        client.audio_features_batched_raw(tracks=dict.fromkeys(uris), cache=cache)
+    )
+
+    # One entry per playlist item, repeated tracks included.
+    rows = np.fromiter((audio_features.index.get(uri, -1) for uri in uris), np.intp, len(uris))
+    bpm = np.where(rows >= 0, audio_features.folded_tempo(threshold)[rows], np.inf)
+    order = np.argsort(bpm, kind='stable')
+    sorted_uris = [uris[i] for i in order]
+
+    for i in order:
+        print(bpm[i] if rows[i] >= 0 else None, items[i].track.name)
+
+    if not dry_run:
+        apply_order(
+            client=client,
+            playlist_id=playlist.id,
+            target=sorted_uris,
+            current=uris,
+            snapshot_id=playlist.snapshot_id,
+            allow_rewrite=allow_rewrite,
+        )
+
+    if dry_run:
+        print(f'Completd dry run: {playlist.name}')
+    else:
+        print(f'Sorted playlist: {playlist.name}')
+
+
 if __name__ == '__main__':
     scopes = [Scope.playlist_modify_private, Scope.playlist_modify_public]
 
@@ -61,5 +113,22 @@ if __name__ == '__main__':
     # THRESHOLD = 170
     THRESHOLD = slow_t
     DRY_RUN = 0
-
-    duplicate_playlist_sorted_by_bpm(client=sp, playlist=USING_PL, threshold=THRESHOLD, dry_run=DRY_RUN)
+    # Sort USING_PL itself instead of creating a sorted copy.
+    IN_PLACE = 0
+
+    if IN_PLACE:
+        sort_playlist_by_bpm(
+            client=sp,
+            playlist=USING_PL,
+            threshold=THRESHOLD,
+            dry_run=DRY_RUN,
+            cache=AudioFeaturesCache(),
+        )
+    else:
+        duplicate_playlist_sorted_by_bpm(
+            client=sp,
+            playlist=USING_PL,
+            threshold=THRESHOLD,
+            dry_run=DRY_RUN,
+            cache=AudioFeaturesCache(),
+        )
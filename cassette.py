@@ -0,0 +1,204 @@
+"""
+Record the HTTP traffic of a run to a cassette file and replay it later without the network.
+
+    cassette = Cassette.record('dw.cassette.json.gz')
+    client = SpotipyClient(username=USER, cassette=cassette)
+    duplicate_discover_weekly(client=client, ...)
+    cassette.save()
+
+    client = SpotipyClient(username=USER, cassette=Cassette.load('dw.cassette.json.gz', latency='zero'))
+    duplicate_discover_weekly(client=client, ...)
+
+A cassette is a gzipped JSON list of interactions: the request method, URL and body, and the response
+status, headers, body and latency. On replay each request is answered with the next recorded response
+for the same method and URL, preferably one whose request had the same body (playlist names may contain
+the date, for example), after the recorded latency unless `latency='zero'`, so caching and
+concurrency changes can be measured against identical traffic.
+Requests for tokens are neither recorded nor replayed, since their bodies hold credentials.
+"""
+import gzip
+import json
+import time
+import base64
+import threading
+from http.client import responses as reasons
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Any, Literal
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CASSETTE_VERSION = 1
+# Authentication goes through this host, see the module docstring.
+ACCOUNTS_URL = 'https://accounts.spotify.com/'
+# The only response headers the clients read.
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Retry-After')
+
+Latency = Literal['original', 'zero']
+
+
+class CassetteError(Exception):
+    """A request that is not on the cassette, or a cassette that cannot be read."""
+
+
+@dataclass(kw_only=True)
+class Interaction:
+    method: str
+    url: str
+    body: str | None
+    status: int
+    headers: dict[str, str]
+    # Base64, since response bodies are bytes.
+    content: str
+    latency_s: float
+
+
+def _body(request: requests.PreparedRequest) -> str | None:
+    if isinstance(request.body, bytes):
+        return request.body.decode('utf-8', errors='replace')
+    # The clients never stream request bodies.
+    return request.body if isinstance(request.body, str) else None
+
+
+def _method_url(request: requests.PreparedRequest) -> tuple[str, str]:
+    if request.method is None or request.url is None:
+        raise CassetteError('Cannot record or replay a request without a method and URL')
+    return request.method, request.url
+
+
+class RecordingAdapter(BaseAdapter):
+    """Sends requests through `adapter` and records them on `cassette`."""
+
+    def __init__(self, adapter: BaseAdapter, cassette: 'Cassette') -> None:
+        super().__init__()
+        self.adapter = adapter
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        method, url = _method_url(request)
+        start = time.perf_counter()
+        response = self.adapter.send(request, *args, **kwargs)
+        latency_s = time.perf_counter() - start
+        if not url.startswith(ACCOUNTS_URL):
+            self.cassette.append(
+                Interaction(
+                    method=method,
+                    url=url,
+                    body=_body(request),
+                    status=response.status_code,
+                    headers={name: response.headers[name]
+                             for name in RECORDED_HEADERS if name in response.headers},
+                    content=base64.b64encode(response.content).decode('ascii'),
+                    latency_s=latency_s,
+                )
+            )
+        return response
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from `cassette` instead of the network."""
+
+    def __init__(self, cassette: 'Cassette') -> None:
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        interaction = self.cassette.next(request)
+        if self.cassette.latency == 'original':
+            time.sleep(interaction.latency_s)
+        response = requests.Response()
+        response.status_code = interaction.status
+        response.reason = reasons.get(interaction.status, '')
+        response.headers = CaseInsensitiveDict(interaction.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(interaction.content)
+        response.url = interaction.url
+        response.request = request
+        response.elapsed = timedelta(seconds=interaction.latency_s)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class Cassette:
+    """Interactions being recorded or replayed, see the module docstring. Thread safe."""
+
+    def __init__(
+        self,
+        path: str,
+        mode: Literal['record', 'replay'],
+        interactions: list[Interaction] | None = None,
+        latency: Latency = 'original',
+    ) -> None:
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.interactions = interactions or []
+        self.lock = threading.Lock()
+        # Responses not replayed yet, by method and URL.
+        self.pending: dict[tuple[str, str], list[Interaction]] = defaultdict(list)
+        for interaction in self.interactions:
+            self.pending[interaction.method, interaction.url].append(interaction)
+
+    @classmethod
+    def record(cls, path: str) -> 'Cassette':
+        """An empty cassette, written to `path` by `save`."""
+        return cls(path, mode='record')
+
+    @classmethod
+    def load(cls, path: str, latency: Latency = 'original') -> 'Cassette':
+        """Replay the cassette at `path`, waiting the recorded latency of each response unless `latency='zero'`."""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != CASSETTE_VERSION:
+            raise CassetteError(f'{path} has cassette version {data.get("version")}, expected {CASSETTE_VERSION}')
+        interactions = [Interaction(**interaction) for interaction in data['interactions']]
+        return cls(path, mode='replay', interactions=interactions, latency=latency)
+
+    def mount(self, session: requests.Session) -> None:
+        """Record or replay every request `session` sends."""
+        for prefix in ('https://', 'http://'):
+            if self.mode == 'record':
+                session.mount(prefix, RecordingAdapter(session.get_adapter(prefix), self))
+            else:
+                session.mount(prefix, ReplayAdapter(self))
+
+    def append(self, interaction: Interaction) -> None:
+        with self.lock:
+            self.interactions.append(interaction)
+
+    def next(self, request: requests.PreparedRequest) -> Interaction:
+        method, url = _method_url(request)
+        body = _body(request)
+        with self.lock:
+            pending = self.pending.get((method, url))
+            if not pending:
+                raise CassetteError(f'No recorded response left for {method} {url}')
+            i = next((i for i, interaction in enumerate(pending) if interaction.body == body), 0)
+            return pending.pop(i)
+
+    @property
+    def remaining(self) -> int:
+        """Recorded responses that have not been replayed."""
+        with self.lock:
+            return sum(len(pending) for pending in self.pending.values())
+
+    def save(self) -> None:
+        with self.lock:
+            data = {
+                'version': CASSETTE_VERSION,
+                'interactions': [asdict(interaction) for interaction in self.interactions],
+            }
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    def __repr__(self) -> str:
+        return f'Cassette({self.path!r}, mode={self.mode!r}, interactions={len(self.interactions)})'
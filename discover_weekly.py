@@ -1,5 +1,9 @@
 import os
+import sys
+import time
+import traceback
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from utils import Scope
 from spotipy_client import SpotipyClient
@@ -8,17 +12,32 @@ ENV_PREFIX = 'DW_'
 L = len(ENV_PREFIX)
 DATE_FMT = '%d-%m-%Y'
 USER = 'emiltelstad'
+# Number of playlists copied concurrently. Must not start with ENV_PREFIX.
+WORKERS = int(os.environ.get('DISCOVER_WEEKLY_WORKERS', 5))
+# Write the API metrics of the run here in the Prometheus text format, e.g. for node_exporter's textfile collector.
+METRICS_FILE = os.environ.get('DISCOVER_WEEKLY_METRICS_FILE')
 
 
 def duplicate_discover_weekly(client: SpotipyClient, name: str, playlist_id: str) -> None:
 
     # Copy Discover Weekly songs.
-    paged_items = client.playlist_items(playlist_id=playlist_id)
-    item_uris = [item.track.uri for item in paged_items.items]
+    item_uris = [item.track.uri for item in client.iter_playlist_items(playlist_id=playlist_id)]
 
     # Create playlist and add songs.
     playlist = client.user_playlist_create(user=USER, name=name, public=False)
-    client.playlist_add_items(items=item_uris, playlist_id=playlist.uri)
+    client.playlist_add_items_bulk(items=item_uris, playlist_id=playlist.uri)
+
+
+def run_job(client: SpotipyClient, name: str, playlist_id: str) -> tuple[float, Exception | None]:
+    """Duplicate one playlist, returns the time spent and the error if it failed."""
+    start = time.perf_counter()
+    try:
+        duplicate_discover_weekly(client=client, name=name, playlist_id=playlist_id)
+    except Exception as e:
+        # One failing user should not stop the others.
+        traceback.print_exc()
+        return time.perf_counter() - start, e
+    return time.perf_counter() - start, None
 
 
 if __name__ == '__main__':
@@ -30,9 +49,22 @@ if __name__ == '__main__':
         scope=[Scope.playlist_modify_private, Scope.playlist_modify_public],
     )
 
-    for env_name, pl_id in DWS.items():
+    names = {env_name: env_name[L:].title() for env_name in DWS}
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        jobs = {
+            env_name: executor.submit(run_job, client=sp, name=f'dw {names[env_name]} - {date}', playlist_id=pl_id)
+            for env_name, pl_id in DWS.items()
+        }
+        results = {env_name: job.result() for env_name, job in jobs.items()}
 
-        name = env_name[L:].title()
-        plname = f'dw {name} - {date}'
+    # Summary.
+    for env_name, (duration_s, error) in results.items():
+        status = f'failed: {error!r}' if error else 'ok'
+        print(f'{names[env_name]:<20} {duration_s:>6.2f}s  {status}')
+    print(sp.metrics.format())
+    if METRICS_FILE:
+        with open(METRICS_FILE, 'w') as f:
+            f.write(sp.metrics.prometheus())
 
-        duplicate_discover_weekly(client=sp, name=plname, playlist_id=pl_id)
+    if any(error for _, error in results.values()):
+        sys.exit(1)
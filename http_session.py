@@ -0,0 +1,117 @@
+import time
+import socket
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection
+
+from rate_limit import RequestScheduler, endpoint_key, parse_retry_after
+from metrics import ApiMetrics
+
+# (connect, read) timeout in seconds.
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+# 429 is handled by `RateLimitedSession` so that every thread backs off, not only the one that got it.
+DEFAULT_RETRY_CODES = (500, 502, 503, 504)
+DEFAULT_RATE_LIMIT_RETRIES = 5
+
+# Spotify rate limits the whole app, so sessions built without a scheduler of their own share this one.
+DEFAULT_SCHEDULER = RequestScheduler()
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keep-alive so idle pooled connections survive between polls."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+class RateLimitedSession(requests.Session):
+    """
+    Session that sends every request through a `RequestScheduler`, retries after 429 responses
+    and records every request in `metrics`.
+    """
+
+    def __init__(
+        self,
+        scheduler: RequestScheduler | None = None,
+        rate_limit_retries: int = DEFAULT_RATE_LIMIT_RETRIES,
+        metrics: ApiMetrics | None = None,
+    ) -> None:
+        super().__init__()
+        self.scheduler = scheduler or DEFAULT_SCHEDULER
+        self.rate_limit_retries = rate_limit_retries
+        self.metrics = metrics or ApiMetrics()
+
+    def request(self, method: str, url: str | bytes, *args: Any, **kwargs: Any) -> requests.Response:
+        endpoint = endpoint_key(method, url.decode() if isinstance(url, bytes) else url)
+        for attempt in range(self.rate_limit_retries + 1):
+            if attempt:
+                self.metrics.observe_retries(endpoint)
+            wait_s = self.scheduler.acquire(endpoint)
+            if wait_s:
+                self.metrics.observe_wait(endpoint, wait_s)
+            response = self._timed_request(endpoint, method, url, *args, **kwargs)
+            if response.status_code != 429:
+                self.scheduler.on_success(endpoint)
+                return response
+            self.scheduler.on_rate_limited(endpoint, parse_retry_after(response.headers.get('Retry-After')))
+        return response
+
+    def _timed_request(
+        self, endpoint: str, method: str, url: str | bytes, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.metrics.observe_request(endpoint, None, time.perf_counter() - start)
+            raise
+        latency_s = time.perf_counter() - start
+        # Retries of server errors happen inside urllib3.
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            self.metrics.observe_retries(endpoint, len(retries.history))
+        response_bytes = len(response.content) if not kwargs.get('stream') else 0
+        self.metrics.observe_request(endpoint, response.status_code, latency_s, response_bytes)
+        return response
+
+
+def build_session(
+    pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    retries: int = 3,
+    backoff_factor: float = 0.3,
+    status_forcelist: tuple[int, ...] = DEFAULT_RETRY_CODES,
+    scheduler: RequestScheduler | None = None,
+    metrics: ApiMetrics | None = None,
+) -> RateLimitedSession:
+    """
+    Build a rate limited session with a sized connection pool, keep-alive and spotipy's retry policy for server errors.
+    `pool_maxsize` should be at least the number of threads sharing the session.
+    Pass the same `metrics` to several sessions to report them together.
+    Sessions are paced together through `DEFAULT_SCHEDULER` unless given a `scheduler`.
+    """
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+        # Otherwise urllib3 retries 429 responses with a Retry-After header itself.
+        respect_retry_after_header=False,
+    )
+    adapter = KeepAliveAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = RateLimitedSession(scheduler=scheduler, metrics=metrics)
+    session.headers['Connection'] = 'keep-alive'
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
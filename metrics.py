@@ -0,0 +1,179 @@
+"""
+Per-endpoint metrics of the requests sent to the API: count, latency histogram, response bytes, status codes,
+retries and time spent waiting for the rate limit.
+
+Sessions from `http_session.build_session` and `AsyncSpotipyClient` record into an `ApiMetrics`, available as
+`client.metrics`:
+
+    client.metrics.snapshot()['GET playlists/{id}/tracks'].quantile_s(0.99)
+    print(client.metrics.format())
+    Path('spotify.prom').write_text(client.metrics.prometheus())
+"""
+import bisect
+import threading
+from dataclasses import dataclass, field, replace
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS_S = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRIC_PREFIX = 'spotify_api'
+
+
+@dataclass(kw_only=True)
+class EndpointMetrics:
+    requests: int = 0
+    # Requests by status code, None for requests that failed without a response.
+    status_codes: dict[int | None, int] = field(default_factory=dict)
+    # Requests by latency bucket, see `LATENCY_BUCKETS_S`. The last bucket counts the slower ones.
+    latency_counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_S) + 1))
+    total_latency_s: float = 0.0
+    max_latency_s: float = 0.0
+    response_bytes: int = 0
+    # Requests sent again after a 429 or a server error.
+    retries: int = 0
+    rate_limit_waits: int = 0
+    rate_limit_wait_s: float = 0.0
+
+    @property
+    def mean_latency_s(self) -> float:
+        return self.total_latency_s / self.requests if self.requests else 0.0
+
+    def quantile_s(self, q: float) -> float:
+        """Upper bound of the latency bucket holding the `q` quantile, at most the slowest request."""
+        rank = q * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_S, self.latency_counts):
+            seen += count
+            if seen >= rank and seen:
+                return min(bound, self.max_latency_s)
+        return self.max_latency_s
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.status_codes.items() if status is None or status >= 400)
+
+
+class ApiMetrics:
+    """Thread safe registry of `EndpointMetrics` by endpoint, see `rate_limit.endpoint_key`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, EndpointMetrics] = {}
+
+    def observe_request(self, endpoint: str, status: int | None, latency_s: float, response_bytes: int = 0) -> None:
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.requests += 1
+            metrics.status_codes[status] = metrics.status_codes.get(status, 0) + 1
+            metrics.latency_counts[bisect.bisect_left(LATENCY_BUCKETS_S, latency_s)] += 1
+            metrics.total_latency_s += latency_s
+            metrics.max_latency_s = max(metrics.max_latency_s, latency_s)
+            metrics.response_bytes += response_bytes
+
+    def observe_retries(self, endpoint: str, retries: int = 1) -> None:
+        with self._lock:
+            self._endpoint(endpoint).retries += retries
+
+    def observe_wait(self, endpoint: str, wait_s: float) -> None:
+        """Record a wait for the rate limit before a request to `endpoint`."""
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.rate_limit_waits += 1
+            metrics.rate_limit_wait_s += wait_s
+
+    def snapshot(self) -> dict[str, EndpointMetrics]:
+        """Copy of the metrics of every endpoint so far."""
+        with self._lock:
+            return {
+                endpoint:
+                    replace(
+                        metrics,
+                        status_codes=dict(metrics.status_codes),
+                        latency_counts=list(metrics.latency_counts),
+                    )
+                for endpoint, metrics in self._endpoints.items()
+            }
+
+    def total(self) -> EndpointMetrics:
+        """Metrics of all endpoints together."""
+        total = EndpointMetrics()
+        for metrics in self.snapshot().values():
+            total.requests += metrics.requests
+            for status, count in metrics.status_codes.items():
+                total.status_codes[status] = total.status_codes.get(status, 0) + count
+            total.latency_counts = [a + b for a, b in zip(total.latency_counts, metrics.latency_counts)]
+            total.total_latency_s += metrics.total_latency_s
+            total.max_latency_s = max(total.max_latency_s, metrics.max_latency_s)
+            total.response_bytes += metrics.response_bytes
+            total.retries += metrics.retries
+            total.rate_limit_waits += metrics.rate_limit_waits
+            total.rate_limit_wait_s += metrics.rate_limit_wait_s
+        return total
+
+    def format(self) -> str:
+        """Table of the metrics by endpoint, slowest in total first."""
+        snapshot = self.snapshot()
+        lines = [
+            f'{"endpoint":<34} {"requests":>8} {"errors":>6} {"mean ms":>8} {"p95 ms":>7} {"max ms":>7} '
+            f'{"KiB":>8} {"retries":>7} {"wait s":>7}'
+        ]
+        rows = sorted(snapshot.items(), key=lambda item: item[1].total_latency_s, reverse=True)
+        for endpoint, metrics in rows + [('total', self.total())]:
+            lines.append(
+                f'{endpoint:<34} {metrics.requests:>8} {metrics.errors:>6} {metrics.mean_latency_s * 1000:>8.0f} '
+                f'{metrics.quantile_s(0.95) * 1000:>7.0f} {metrics.max_latency_s * 1000:>7.0f} '
+                f'{metrics.response_bytes / 1024:>8.1f} {metrics.retries:>7} {metrics.rate_limit_wait_s:>7.1f}'
+            )
+        return '\n'.join(lines)
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        p = METRIC_PREFIX
+        lines = [
+            f'# HELP {p}_requests_total Requests sent, by status code.',
+            f'# TYPE {p}_requests_total counter',
+        ]
+        for endpoint, metrics in snapshot.items():
+            for status, count in metrics.status_codes.items():
+                status_label = 'error' if status is None else str(status)
+                lines.append(f'{p}_requests_total{{{_labels(endpoint)},status="{status_label}"}} {count}')
+
+        lines += [
+            f'# HELP {p}_request_duration_seconds Time until the response was received.',
+            f'# TYPE {p}_request_duration_seconds histogram',
+        ]
+        for endpoint, metrics in snapshot.items():
+            labels = _labels(endpoint)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_S, metrics.latency_counts):
+                cumulative += count
+                lines.append(f'{p}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines += [
+                f'{p}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.requests}',
+                f'{p}_request_duration_seconds_sum{{{labels}}} {metrics.total_latency_s}',
+                f'{p}_request_duration_seconds_count{{{labels}}} {metrics.requests}',
+            ]
+
+        counters = [
+            ('response_bytes_total', 'Bytes of response bodies.', 'response_bytes'),
+            ('retries_total', 'Requests sent again after a 429 or a server error.', 'retries'),
+            ('rate_limit_waits_total', 'Requests delayed by the rate limit.', 'rate_limit_waits'),
+            ('rate_limit_wait_seconds_total', 'Time requests were delayed by the rate limit.', 'rate_limit_wait_s'),
+        ]
+        for name, description, attribute in counters:
+            lines += [f'# HELP {p}_{name} {description}', f'# TYPE {p}_{name} counter']
+            for endpoint, metrics in snapshot.items():
+                lines.append(f'{p}_{name}{{{_labels(endpoint)}}} {getattr(metrics, attribute)}')
+        return '\n'.join(lines) + '\n'
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = EndpointMetrics()
+        return self._endpoints[endpoint]
+
+
+def _labels(endpoint: str) -> str:
+    """Prometheus labels of an endpoint key such as 'GET playlists/{id}/tracks'."""
+    method, _, path = endpoint.partition(' ')
+    path = path.replace('\\', '\\\\').replace('"', '\\"')
+    return f'method="{method}",endpoint="{path}"'
@@ -0,0 +1,208 @@
+"""
+Alternative ways to build the dataclasses in `mytypes.types` from API responses.
+"""
+import types
+from functools import cache, partial
+from dataclasses import MISSING, fields, is_dataclass
+from typing import Any, Callable, Union, get_args, get_origin
+
+from mytypes.identity import active_map, interned
+
+try:
+    # Optional, several times faster than the standard library.
+    from orjson import loads
+except ImportError:
+    from json import loads  # type: ignore[assignment]
+
+Converter = Callable[[Any], Any]
+
+
+def _field_converter(tp: Any) -> Converter | None:
+    """Returns a function that lazily decodes a raw value of type `tp`, or None if the value is kept as is."""
+    if isinstance(tp, type) and is_dataclass(tp):
+        return _dataclass_converter(tp)
+
+    origin = get_origin(tp)
+    if origin is list:
+        item_converter = _field_converter(get_args(tp)[0])
+        if item_converter is None:
+            return None
+        return lambda value: [item_converter(item) for item in value] if isinstance(value, list) else value
+
+    if origin in (Union, types.UnionType):
+        classes = [arg for arg in get_args(tp) if isinstance(arg, type) and is_dataclass(arg)]
+        if len(classes) <= 1:
+            return _dataclass_converter(classes[0]) if classes else None
+        # E.g. TrackObject | EpisodeObject, told apart by their `type` field.
+        by_type = {get_args(cls.__dataclass_fields__['type'].type)[0]: _dataclass_converter(cls) for cls in classes}
+        return lambda value: by_type[value['type']](value) if isinstance(value, dict) else value
+
+    return None
+
+
+def _dataclass_converter(cls: type) -> Converter:
+    build = partial(lazy, cls)
+    return lambda value: interned(cls, value, build) if isinstance(value, dict) else value
+
+
+class _LazyField:
+    """Non-data descriptor that decodes a nested field on first access and memoizes it in the instance."""
+
+    def __init__(self, name: str, converter: Converter, default: Any = MISSING) -> None:
+        self.name = name
+        self.converter = converter
+        self.default = default
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        raw = instance.__dict__['_lazy_raw']
+        if self.name not in raw:
+            if self.default is not MISSING:
+                return self.default
+            raise AttributeError(f'{owner.__name__!r} object has no attribute {self.name!r}')
+        identity_map = instance.__dict__['_lazy_identity_map']
+        if identity_map is None:
+            value = self.converter(raw.pop(self.name))
+        else:
+            # Share entities through the identity map that was active when the instance was built.
+            with identity_map.active():
+                value = self.converter(raw.pop(self.name))
+        # Found before this descriptor from now on.
+        instance.__dict__[self.name] = value
+        return value
+
+
+@cache
+def _lazy_class(cls: type) -> tuple[type, frozenset[str], dict[str, Any]]:
+    """
+    Subclass of `cls` with nested fields replaced by `_LazyField`s,
+    the names of those fields and the defaults of the other fields.
+    """
+    namespace: dict[str, Any] = {'__module__': cls.__module__, '__qualname__': cls.__qualname__}
+    defaults: dict[str, Any] = {}
+    for f in fields(cls):
+        converter = _field_converter(f.type)
+        if converter is not None:
+            namespace[f.name] = _LazyField(f.name, converter, f.default)
+        elif f.default is not MISSING:
+            defaults[f.name] = f.default
+    lazy_fields = frozenset(name for name in namespace if not name.startswith('__'))
+
+    def __eq__(self: Any, other: Any) -> bool:
+        # Equal to eager instances of `cls` as well.
+        if not isinstance(other, cls) or _base_class(type(other)) is not cls:
+            return NotImplemented
+        return all(getattr(self, f.name) == getattr(other, f.name) for f in fields(cls))
+
+    namespace['__eq__'] = __eq__
+    namespace['_lazy_base'] = cls
+    # Without __slots__ the subclass gets a __dict__, which holds the raw data and the decoded fields.
+    return type(cls.__name__, (cls, ), namespace), lazy_fields, defaults
+
+
+def _base_class(cls: type) -> type:
+    return cls.__dict__.get('_lazy_base', cls)
+
+
+def lazy(cls: type, data: dict[str, Any]) -> Any:
+    """
+    Build an instance of `cls` without running `__init__`/`__post_init__`.
+    Plain fields are set right away, nested dataclasses are decoded from `data` on first access.
+    The instance passes `isinstance(obj, cls)`. Fields missing from `data` fall back to their default,
+    or raise AttributeError when accessed, so partial responses can be decoded as well.
+    """
+    lazy_cls, lazy_fields, defaults = _lazy_class(cls)
+    instance: Any = object.__new__(lazy_cls)
+    raw = {}
+    for name, value in defaults.items():
+        setattr(instance, name, value)
+    for name, value in data.items():
+        if name in lazy_fields:
+            raw[name] = value
+        else:
+            # Plain fields live in the slots of `cls`.
+            setattr(instance, name, value)
+    instance.__dict__['_lazy_raw'] = raw
+    instance.__dict__['_lazy_identity_map'] = active_map()
+    return instance
+
+
+def _fast_converter(tp: Any) -> tuple[str, dict[str, Any]] | None:
+    """
+    Source of an expression that decodes `value` of type `tp`, and the names it refers to,
+    or None if the value is kept as is.
+    """
+    if isinstance(tp, type) and is_dataclass(tp):
+        return _fast_dataclass_converter(tp)
+
+    origin = get_origin(tp)
+    if origin is list:
+        item = _fast_converter(get_args(tp)[0])
+        if item is None:
+            return None
+        expression, names = item
+        return f'[{expression.replace("value", "item")} for item in value]', names
+
+    if origin in (Union, types.UnionType):
+        classes = [arg for arg in get_args(tp) if isinstance(arg, type) and is_dataclass(arg)]
+        if not classes:
+            return None
+        if len(classes) == 1:
+            expression, names = _fast_dataclass_converter(classes[0])
+        else:
+            # E.g. TrackObject | EpisodeObject, told apart by their `type` field.
+            by_type = {get_args(cls.__dataclass_fields__['type'].type)[0]: _fast_decoder(cls) for cls in classes}
+            expression, names = 'decoders_{0}[value["type"]](value)', {'decoders_{0}': by_type}
+        if type(None) in get_args(tp):
+            expression = f'({expression} if value is not None else None)'
+        return expression, names
+
+    return None
+
+
+def _fast_dataclass_converter(cls: type) -> tuple[str, dict[str, Any]]:
+    return 'decode_{0}(value)', {'decode_{0}': _fast_decoder(cls)}
+
+
+@cache
+def _fast_decoder(cls: type) -> Callable[[dict[str, Any]], Any]:
+    """
+    Compiles a function that builds `cls` from a parsed response without running `__init__`/`__post_init__`.
+    Nested dataclasses are built by their own compiled functions, each field is handled once.
+    """
+    namespace: dict[str, Any] = {'cls': cls, 'new': object.__new__}
+    lines = ['def decode(data):', '    obj = new(cls)']
+    for i, f in enumerate(fields(cls)):
+        if f.default is not MISSING:
+            namespace[f'default_{i}'] = f.default
+            lines.append(f'    value = data.get({f.name!r}, default_{i})')
+        else:
+            lines.append(f'    value = data[{f.name!r}]')
+        converter = _fast_converter(f.type)
+        if converter is None:
+            lines.append(f'    obj.{f.name} = value')
+        else:
+            expression, names = converter
+            namespace.update((name.format(i), value) for name, value in names.items())
+            lines.append(f'    obj.{f.name} = {expression.format(i)}')
+    lines.append('    return obj')
+    exec('\n'.join(lines), namespace)
+    decode: Callable[[dict[str, Any]], Any] = namespace['decode']
+    if getattr(cls, '_identity', None):
+        return partial(interned, cls, build=decode)
+    return decode
+
+
+def fast(cls: type, data: dict[str, Any] | bytes | str) -> Any:
+    """
+    Build an instance of `cls` from a response body or its parsed JSON with a decoder compiled for `cls`.
+    The result equals `cls(**data)`, but skips the keyword arguments and the `__post_init__` that rebuild
+    every nested object. Keys that are not fields of `cls` are ignored.
+    """
+    if not isinstance(data, dict):
+        data = loads(data)
+    try:
+        return _fast_decoder(cls)(data)
+    except KeyError as e:
+        raise TypeError(f'{cls.__name__} response is missing the field {e}') from e
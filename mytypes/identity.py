@@ -0,0 +1,83 @@
+"""
+Identity map that lets responses share one instance per catalog entity.
+
+The same albums, artists and images are repeated for every track that refers to them. While an
+`IdentityMap` is active, decoding returns the instance already built for the same class and Spotify URI
+(or image URL) instead of building another one. Instances are held weakly, so entries are dropped as soon
+as no decoded response refers to them anymore.
+
+Shared instances are seen by every response that contains them, so treat them as read-only.
+Partial objects, decoded from responses filtered with `fields`, are built `detached` from any map,
+otherwise a later full read would be handed the partial instance.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, TypeVar
+from weakref import WeakValueDictionary
+
+T = TypeVar('T')
+
+_active: ContextVar['IdentityMap | None'] = ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    """Instances of the entity classes in `mytypes.types`, keyed by class and identity."""
+
+    def __init__(self) -> None:
+        self.instances: WeakValueDictionary[tuple[type, str], Any] = WeakValueDictionary()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+    def get_or_build(self, cls: type[T], key: str, build: Callable[[], T]) -> T:
+        with self.lock:
+            instance = self.instances.get((cls, key))
+            if instance is not None:
+                self.hits += 1
+                return instance
+            self.misses += 1
+        # Built outside the lock, nested entities are looked up while building.
+        instance = build()
+        with self.lock:
+            # Another thread may have built it meanwhile, keep the first one.
+            return self.instances.setdefault((cls, key), instance)
+
+    @contextmanager
+    def active(self) -> Iterator['IdentityMap']:
+        """Use this map for everything decoded in the current thread or task until exit."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+
+def active_map() -> IdentityMap | None:
+    return _active.get()
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Use no identity map for everything decoded in the current thread or task until exit."""
+    token = _active.set(None)
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+def interned(cls: type[T], data: dict[str, Any], build: Callable[[dict[str, Any]], T] | None = None) -> T:
+    """
+    Build `cls` from `data` with `build` (`cls(**data)` by default), or return the instance
+    already built for the same entity if an identity map is active and `cls` declares an `_identity` field.
+    """
+    identity_map = _active.get()
+    field = getattr(cls, '_identity', None)
+    key = data.get(field) if field else None
+    if identity_map is None or key is None:
+        return build(data) if build else cls(**data)
+    return identity_map.get_or_build(cls, key, lambda: build(data) if build else cls(**data))
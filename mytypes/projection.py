@@ -0,0 +1,122 @@
+"""
+Typed field projections for the `fields` filter of the Spotify Web API.
+
+    >>> projection = Projection(PagedPlaylistTrackObject, 'next', 'items.track.uri', 'items.track.artists.name')
+    >>> str(projection)
+    'next,items(track(type,uri,artists(name)))'
+
+Paths are checked against the dataclasses in `mytypes.types`, and `parse` builds partial instances
+of them: attributes that were not requested fall back to their default or raise AttributeError.
+
+https://developer.spotify.com/documentation/web-api/reference/get-playlist
+"""
+import types
+from dataclasses import fields, is_dataclass
+from typing import Any, Generic, TypeVar, Union, get_args, get_origin
+
+from mytypes.decode import lazy
+
+T = TypeVar('T')
+
+Tree = dict[str, 'Tree']
+
+
+def _dataclasses_of(tp: Any) -> list[type]:
+    """The dataclasses a field of type `tp` can hold, looking through lists and unions."""
+    if is_dataclass(tp):
+        return [tp]
+    origin = get_origin(tp)
+    if origin is list:
+        return _dataclasses_of(get_args(tp)[0])
+    if origin in (Union, types.UnionType):
+        return [cls for arg in get_args(tp) for cls in _dataclasses_of(arg)]
+    return []
+
+
+def _field_types(classes: list[type], name: str) -> list[Any]:
+    return [f.type for cls in classes for f in fields(cls) if f.name == name]
+
+
+class Projection(Generic[T]):
+    """
+    Selection of (nested) attributes of `cls`, e.g. `Projection(PlaylistObject, 'name', 'tracks.items.track.uri')`.
+    Renders as the `fields` query parameter, and `parse` decodes the matching response into a partial `cls`.
+    """
+
+    def __init__(self, cls: type[T], *paths: str) -> None:
+        if not paths:
+            raise ValueError('A projection needs at least one field')
+        self.cls = cls
+        self.paths = tuple(dict.fromkeys(paths))
+        self.tree: Tree = {}
+        for path in self.paths:
+            self._add(path)
+
+    def _add(self, path: str) -> None:
+        node, classes = self.tree, [self.cls]
+        for name in path.split('.'):
+            field_types = _field_types(classes, name)
+            if not field_types:
+                owners = ' | '.join(cls.__name__ for cls in classes)
+                raise ValueError(f'Invalid field {path!r}: {owners} has no attribute {name!r}')
+            classes = [cls for tp in field_types for cls in _dataclasses_of(tp)]
+            node = node.setdefault(name, {})
+            if len(classes) > 1:
+                # Decoding tells e.g. TrackObject and EpisodeObject apart by their `type` field.
+                node.setdefault('type', {})
+
+    def with_paths(self, *paths: str) -> 'Projection[T]':
+        """Copy of this projection that also selects `paths`."""
+        return Projection(self.cls, *self.paths, *paths)
+
+    def __contains__(self, path: str) -> bool:
+        node = self.tree
+        for name in path.split('.'):
+            if name not in node:
+                return False
+            node = node[name]
+        return True
+
+    def __str__(self) -> str:
+        return _render(self.tree)
+
+    def __repr__(self) -> str:
+        return f'Projection({self.cls.__name__}, {", ".join(map(repr, self.paths))})'
+
+    def parse(self, data: dict[str, Any]) -> T:
+        """Partial instance of `cls` from a response requested with this projection."""
+        return lazy(self.cls, data)
+
+
+def _render(tree: Tree) -> str:
+    return ','.join(f'{name}({_render(children)})' if children else name for name, children in tree.items())
+
+
+def _top_level_fields(fields: str) -> list[str]:
+    """Names of the top-level fields of a `fields` string, e.g. ['next', 'items'] for 'next,items(track(uri))'."""
+    names, depth, start = [], 0, 0
+    for i, char in enumerate(fields + ','):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            names.append(fields[start:i].split('(', 1)[0].strip())
+            start = i + 1
+    return names
+
+
+def with_field(fields: 'str | Projection[T]', name: str) -> 'str | Projection[T]':
+    """`fields` that also selects the top-level field `name`."""
+    if isinstance(fields, Projection):
+        return fields if name in fields else fields.with_paths(name)
+    return fields if name in _top_level_fields(fields) else f'{fields},{name}'
+
+
+def fields_param(cls: type, fields: 'str | Projection | None') -> str | None:
+    """The `fields` query parameter for an endpoint returning `cls`."""
+    if isinstance(fields, Projection):
+        if fields.cls is not cls:
+            raise ValueError(f'Expected a projection of {cls.__name__}, got {fields!r}')
+        return str(fields)
+    return fields
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Any, Literal
+from typing import Any, ClassVar, Literal
+
+from mytypes.identity import interned
 
 ##############################################
 #                   Types                    #
@@ -33,8 +35,13 @@ class Genre:
 #                Dataclasses                 #
 ##############################################
 
+# Slots keep the many small objects of large responses compact.
+# The decorator recreates slotted classes, so use super(Class, self) rather than super() in them.
+# Catalog entities declare the field that identifies them in `_identity` and are built with `interned`,
+# so they can be shared between responses, see `mytypes.identity`. That needs a weakref slot.
+
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Page:
     href: str
     limit: int
@@ -44,13 +51,17 @@ class Page:
     next: str | None = None
     previous: str | None = None
 
+    def __post_init__(self) -> None:
+        # Subclasses decode `items` and call this first.
+        pass
 
-@dataclass(kw_only=True)
+
+@dataclass(kw_only=True, slots=True)
 class CopyrightObject:
     available_markets: list[str]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class CopyrightObject2:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-a-show
@@ -59,48 +70,50 @@ class CopyrightObject2:
     type: Literal['C'] | Literal['P']
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Restrictions:
     reason: str
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Followers:
     href: str | None
     total: int
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ExternalIds:
     isrc: str | None = None
     ean: str | None = None
     upc: str | None = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ExternalUrls:
     spotify: str = ''
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, weakref_slot=True)
 class ImageObject:
+    _identity: ClassVar[str] = 'url'
+
     height: int
     width: int
     url: str
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Thumbnail:
     url: str
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ResumePoint:
     fully_played: bool
     resume_position_ms: int
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Person:
     external_urls: ExternalUrls
     href: str
@@ -112,8 +125,10 @@ class Person:
         self.external_urls = ExternalUrls(**self.external_urls)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, weakref_slot=True)
 class SimplifiedArtistObject:
+    _identity: ClassVar[str] = 'uri'
+
     external_urls: ExternalUrls
     href: str
     id: str
@@ -125,7 +140,7 @@ class SimplifiedArtistObject:
         self.external_urls = ExternalUrls(**self.external_urls)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ArtistObject(SimplifiedArtistObject):
     """https://developer.spotify.com/documentation/web-api/reference/get-an-artist"""
     followers: Followers
@@ -134,17 +149,19 @@ class ArtistObject(SimplifiedArtistObject):
     popularity: int
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(ArtistObject, self).__post_init__()
         self.external_urls = ExternalUrls(**self.external_urls)
         self.followers = Followers(**self.followers)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, weakref_slot=True)
 class SimplifiedAlbumObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-artists-albums
     """
+    _identity: ClassVar[str] = 'uri'
+
     album_type: AlbumType
     available_markets: list[str]
     external_urls: ExternalUrls
@@ -162,12 +179,12 @@ class SimplifiedAlbumObject:
 
     def __post_init__(self) -> None:
         self.external_urls = ExternalUrls(**self.external_urls)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
         # self.restrictions = Restrictions(**self.restrictions)
-        self.artists = [SimplifiedArtistObject(**data) for data in self.artists]
+        self.artists = [interned(SimplifiedArtistObject, data) for data in self.artists]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class TrackObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-artists-top-tracks
@@ -195,14 +212,14 @@ class TrackObject:
     episode: bool | None = None  # undocumented?
 
     def __post_init__(self) -> None:
-        self.album = SimplifiedAlbumObject(**self.album)
-        self.artists = [SimplifiedArtistObject(**data) for data in self.artists]
+        self.album = interned(SimplifiedAlbumObject, self.album)
+        self.artists = [interned(SimplifiedArtistObject, data) for data in self.artists]
         self.external_ids = ExternalIds(**self.external_ids)
         self.external_urls = ExternalUrls(**self.external_urls)
         # self.restrictions = Restrictions(**self.restrictions)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Show:
     available_markets: list[str]
     copyrights: list[CopyrightObject]
@@ -225,10 +242,10 @@ class Show:
     def __post_init__(self) -> None:
         self.copyrights = [CopyrightObject(**data) for data in self.copyrights]
         self.external_urls = ExternalUrls(**self.external_urls)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SimplifiedEpisodeObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-a-show
@@ -257,17 +274,17 @@ class SimplifiedEpisodeObject:
 
     def __post_init__(self) -> None:
         self.external_urls = ExternalUrls(**self.external_urls)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
         self.resume_point = ResumePoint(**self.resume_point) if self.resume_point else self.resume_point
         self.restrictions = Restrictions(**self.restrictions) if self.restrictions else self.restrictions
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class EpisodeObject(SimplifiedEpisodeObject):
     ...
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedSimplifiedEpisodeObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-a-shows-episodes
@@ -278,7 +295,7 @@ class PagedSimplifiedEpisodeObject(Page):
         self.items = [SimplifiedEpisodeObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Owner:
     external_urls: ExternalUrls
     # followers: Followers
@@ -293,7 +310,7 @@ class Owner:
         # self.followers = Followers(**self.followers)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PlaylistTrackObject:
     added_at: str
     added_by: Person
@@ -311,7 +328,7 @@ class PlaylistTrackObject:
         self.video_thumbnail = Thumbnail(**self.video_thumbnail)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedPlaylistTrackObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-playlists-tracks
@@ -323,7 +340,7 @@ class PagedPlaylistTrackObject(Page):
         self.items = [PlaylistTrackObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class AlbumObject(SimplifiedAlbumObject):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-album
@@ -336,13 +353,13 @@ class AlbumObject(SimplifiedAlbumObject):
     popularity: int
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(AlbumObject, self).__post_init__()
         self.tracks = PagedPlaylistTrackObject(**self.tracks)
         self.copyrights = [CopyrightObject(**data) for data in self.copyrights]
         self.external_ids = ExternalIds(**self.external_ids)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SavedAlbumObject(AlbumObject):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-users-saved-albums
@@ -351,17 +368,17 @@ class SavedAlbumObject(AlbumObject):
     album: AlbumObject
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(SavedAlbumObject, self).__post_init__()
         self.album = PagedPlaylistTrackObject(**self.album)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class TrackObject2:
     href: str
     total: int
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class AudioFeaturesObject:
     acousticness: float
     analysis_url: str
@@ -383,7 +400,7 @@ class AudioFeaturesObject:
     valence: float
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SimplifiedPlaylistObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/search
@@ -399,33 +416,35 @@ class SimplifiedPlaylistObject:
     owner: Owner
     public: bool
     snapshot_id: str
-    tracks: PagedPlaylistTrackObject
-    # tracks: TrackObject2
+    # Only a reference to the items, `PlaylistObject` has the first page.
+    tracks: TrackObject2
     type: Literal['playlist']
     uri: str
+    _tracks_class: ClassVar[type] = TrackObject2
 
     def __post_init__(self) -> None:
         self.external_urls = ExternalUrls(**self.external_urls)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
         self.owner = Owner(**self.owner)
-        self.tracks = PagedPlaylistTrackObject(**self.tracks)
-        # self.tracks = TrackObject2(**self.tracks)
+        self.tracks = self._tracks_class(**self.tracks)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PlaylistObject(SimplifiedPlaylistObject):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-playlist
     """
     followers: Followers
     primary_color: str | None  # undocumented?
+    tracks: PagedPlaylistTrackObject
+    _tracks_class: ClassVar[type] = PagedPlaylistTrackObject
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(PlaylistObject, self).__post_init__()
         self.followers = Followers(**self.followers)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class DeviceObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-information-about-the-users-current-playback
@@ -440,7 +459,7 @@ class DeviceObject:
     volume_percent: int | None = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ContextObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-information-about-the-users-current-playback
@@ -454,7 +473,7 @@ class ContextObject:
         self.external_urls = ExternalUrls(**self.external_urls)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ActionsObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-information-about-the-users-current-playback
@@ -471,7 +490,7 @@ class ActionsObject:
     transferring_playback: bool | None = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class ActionsObjectWrapper:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-information-about-the-users-current-playback
@@ -482,7 +501,7 @@ class ActionsObjectWrapper:
         self.disallows = ActionsObject(**self.disallows)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PlaybackState:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-information-about-the-users-current-playback
@@ -506,7 +525,7 @@ class PlaybackState:
         self.actions = ActionsObjectWrapper(**self.actions)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedArtistObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/search
@@ -514,11 +533,11 @@ class PagedArtistObject(Page):
     items: list[ArtistObject]
 
     def __post_init__(self) -> None:
-        super().__post_init__()
-        self.items = [ArtistObject(**data) for data in self.items]
+        super(PagedArtistObject, self).__post_init__()
+        self.items = [interned(ArtistObject, data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SetOfAlbumObjects:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-multiple-albums
@@ -526,10 +545,10 @@ class SetOfAlbumObjects:
     albums: list[AlbumObject]
 
     def __post_init__(self) -> None:
-        self.albums = [AlbumObject(**data) for data in self.albums]
+        self.albums = [interned(AlbumObject, data) for data in self.albums]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedSavedAlbumObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-users-saved-albums
@@ -537,11 +556,11 @@ class PagedSavedAlbumObject(Page):
     items: list[SavedAlbumObject]
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(PagedSavedAlbumObject, self).__post_init__()
         self.items = [SavedAlbumObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SetOfArtistObjects:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-multiple-artists
@@ -549,10 +568,10 @@ class SetOfArtistObjects:
     artists: list[ArtistObject]
 
     def __post_init__(self) -> None:
-        self.artists = [ArtistObject(**data) for data in self.artists]
+        self.artists = [interned(ArtistObject, data) for data in self.artists]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedSimplifiedAlbumObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-artists-albums
@@ -560,11 +579,11 @@ class PagedSimplifiedAlbumObject(Page):
     items: list[SimplifiedAlbumObject]
 
     def __post_init__(self) -> None:
-        super().__post_init__()
-        self.items = [SimplifiedAlbumObject(**data) for data in self.items]
+        super(PagedSimplifiedAlbumObject, self).__post_init__()
+        self.items = [interned(SimplifiedAlbumObject, data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SetOfTracks:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-artists-top-tracks
@@ -575,7 +594,7 @@ class SetOfTracks:
         self.tracks = [TrackObject(**data) for data in self.tracks]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SetOfAudioFeaturesObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-an-artists-top-tracks
@@ -586,7 +605,7 @@ class SetOfAudioFeaturesObject:
         self.audio_features = [AudioFeaturesObject(**data) for data in self.audio_features]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedTrackObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/search
@@ -594,11 +613,11 @@ class PagedTrackObject(Page):
     items: list[TrackObject]
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(PagedTrackObject, self).__post_init__()
         self.items = [TrackObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedSimplifiedPlaylistObject(Page):
     """
     https://developer.spotify.com/documentation/web-api/reference/get-list-users-playlists
@@ -607,11 +626,11 @@ class PagedSimplifiedPlaylistObject(Page):
     items: list[SimplifiedPlaylistObject]
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        super(PagedSimplifiedPlaylistObject, self).__post_init__()
         self.items = [SimplifiedPlaylistObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class PagedSetSimplifiedPlaylistObject:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-featured-playlists
@@ -624,7 +643,7 @@ class PagedSetSimplifiedPlaylistObject:
         self.playlists = [PagedSimplifiedPlaylistObject(**data) for data in self.playlists]
 
 
-# @dataclass(kw_only=True)
+# @dataclass(kw_only=True, slots=True)
 # class PagedSimplifiedShowObject(Page):
 #     """
 #     https://developer.spotify.com/documentation/web-api/reference/search
@@ -635,7 +654,7 @@ class PagedSetSimplifiedPlaylistObject:
 #         self.items = [SimplifiedShowObject(**data) for data in self.items]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SearchResponse:
     """
     https://developer.spotify.com/documentation/web-api/reference/search
@@ -659,7 +678,7 @@ class SearchResponse:
         # self.audiobooks = PagedSimplifiedAudiobookObject(**self.audiobooks)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Show:
     """
     https://developer.spotify.com/documentation/web-api/reference/get-a-show
@@ -686,5 +705,5 @@ class Show:
     def __post_init__(self) -> None:
         self.copyrights = [CopyrightObject2(**data) for data in self.copyrights]
         self.external_urls = ExternalUrls(**self.external_urls)
-        self.images = [ImageObject(**data) for data in self.images]
+        self.images = [interned(ImageObject, data) for data in self.images]
         self.episodes = PagedSimplifiedEpisodeObject(**self.episodes)
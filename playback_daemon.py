@@ -0,0 +1,244 @@
+"""
+Host the playback sessions of many users in one process.
+
+Every session is an `AsyncPlaybackWatcher` with its own user, credentials and policies, running as a task on one
+event loop. All sessions send their requests through one pooled HTTP client, so dozens of them cost about
+as much as one while they sleep between polls.
+
+Usage: python playback_daemon.py user1[=policy,...] [user2[=policy,...] ...]
+
+A policy is a name from `POLICIES` with an optional argument, for example `alice=mid:10,end bob=repeat:3,sleep:3600`.
+Users without policies get `DEFAULT_POLICIES`.
+"""
+import sys
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable
+
+import httpx
+from spotipy.exceptions import SpotifyException
+
+from utils import Scope
+from metrics import ApiMetrics
+from token_manager import TokenManager
+from mytypes.types import PlaybackState
+from async_spotipy_client import AsyncSpotipyClient, build_async_http
+from playback_watcher import (
+    Action,
+    Pause,
+    SetRepeat,
+    Policy,
+    BasePlaybackWatcher,
+    MidSongPause,
+    EndOfSongPause,
+    RepeatN,
+    SleepTimer,
+)
+from playback_scheduler import PlaybackScheduler
+from playback_timing import PlaybackClock
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_SCOPE = [
+    Scope.user_read_playback_state,
+    Scope.user_read_playback_position,
+    Scope.user_modify_playback_state,
+]
+# Wait this long before restarting a session that failed.
+RESTART_DELAY_S = 30
+
+# Policy factories by name, called with the argument given after the name, if any.
+POLICIES: dict[str, Callable[..., Policy]] = {
+    'mid': lambda pause_s='5': MidSongPause(pause_s=float(pause_s)),
+    'end': lambda before_end_s='1': EndOfSongPause(before_end_s=float(before_end_s)),
+    'repeat': lambda times='2': RepeatN(times=int(times)),
+    'sleep': lambda after_s: SleepTimer(after_s=float(after_s)),
+}
+DEFAULT_POLICIES = 'mid:5,end:1'
+
+
+class AsyncPlaybackWatcher(BasePlaybackWatcher):
+    """Same as `PlaybackWatcher` for an `AsyncSpotipyClient`, sleeping on the event loop between polls."""
+
+    def __init__(
+        self,
+        client: AsyncSpotipyClient,
+        policies: list[Policy],
+        scheduler: PlaybackScheduler | None = None,
+        clock: PlaybackClock | None = None,
+    ) -> None:
+        super().__init__(policies, scheduler=scheduler, clock=clock)
+        self.client = client
+
+    async def poll(self) -> PlaybackState | None:
+        """Fetch the playback state once, let every policy react to it and return the latest state."""
+        try:
+            state = await self.clock.current_playback_async(self.client)
+        except (SpotifyException, httpx.TransportError):
+            # This could happen if slow internet connection etc.
+            return None
+        return await self.execute(self.react(state), state)
+
+    async def execute(self, actions: list[Action], state: PlaybackState | None) -> PlaybackState | None:
+        """Carry out `actions` in order, pausing at most once, and return the latest known state."""
+        for action in self.plan(actions):
+            try:
+                if isinstance(action, SetRepeat):
+                    await self.client.repeat(state=action.state)
+                else:
+                    state = await self.pause(action, state)
+            except (SpotifyException, httpx.TransportError):
+                pass
+        return state
+
+    async def pause(self, action: Pause, state: PlaybackState | None) -> PlaybackState | None:
+        if action.at_ms is not None and state is not None:
+            await self.clock.run_at_async(state, action.at_ms, self.client.pause_playback)
+            # Check where it actually paused.
+            state = await self.clock.current_playback_async(self.client)
+            self.clock.record_error(action.at_ms, state)
+        else:
+            await self.client.pause_playback()
+        if action.resume_after_s is not None:
+            await asyncio.sleep(action.resume_after_s)
+            await self.client.start_playback()
+        return state
+
+    async def run(self, max_duration: timedelta | None = None) -> None:
+        """Poll until a policy stops the watcher, or `max_duration` has passed."""
+        deadline_s = time.time() + max_duration.total_seconds() if max_duration is not None else None
+        while not self.stopped:
+            if deadline_s is not None and time.time() >= deadline_s:
+                return
+            if idle_s := self.idle_s(deadline_s):
+                await asyncio.sleep(idle_s)
+                continue
+            state = await self.poll()
+            if not self.stopped:
+                await asyncio.sleep(self.delay(state))
+
+
+class PlaybackDaemon:
+    """
+    Runs one `AsyncPlaybackWatcher` per user on the current event loop, sharing one HTTP client.
+
+        async with PlaybackDaemon() as daemon:
+            await daemon.add('user1', [MidSongPause(), EndOfSongPause()])
+            await daemon.add('user2', [RepeatN(times=2)])
+            await daemon.wait()
+    """
+
+    def __init__(self, http: httpx.AsyncClient | None = None) -> None:
+        self.http = http or build_async_http()
+        # Requests of every session, see `metrics`.
+        self.metrics = ApiMetrics()
+        self.watchers: dict[str, AsyncPlaybackWatcher] = {}
+        self.tasks: dict[str, asyncio.Task] = {}
+        # Users whose client is being set up by `add`.
+        self.starting: set[str] = set()
+
+    async def __aenter__(self) -> 'PlaybackDaemon':
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def add(
+        self,
+        username: str,
+        policies: list[Policy],
+        max_duration: timedelta | None = None,
+    ) -> AsyncPlaybackWatcher:
+        """
+        Start a session for `username`, who is asked to log in if there is no cached token.
+        Each session needs its own policy instances, since they keep per-track state.
+        """
+        if username in self.tasks or username in self.starting:
+            raise ValueError(f'{username} already has a session')
+        self.starting.add(username)
+        try:
+            # Reads the token cache and may refresh the token or prompt for a login, off the event loop.
+            client = await asyncio.to_thread(
+                AsyncSpotipyClient,
+                username=username,
+                scope=PLAYBACK_SCOPE,
+                http=self.http,
+                fast=True,
+                metrics=self.metrics,
+            )
+        finally:
+            self.starting.discard(username)
+        watcher = AsyncPlaybackWatcher(client, policies)
+        self.watchers[username] = watcher
+        self.tasks[username] = asyncio.create_task(self._run(username, watcher, max_duration), name=username)
+        return watcher
+
+    async def remove(self, username: str) -> None:
+        """Stop the session of `username`."""
+        task = self.tasks.pop(username)
+        watcher = self.watchers.pop(username)
+        watcher.stopped = True
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        if isinstance(watcher.client.auth_manager, TokenManager):
+            # Cancel its refresh timer, keeping the token handling off the event loop like `add`.
+            await asyncio.to_thread(watcher.client.auth_manager.stop)
+
+    async def wait(self) -> None:
+        """Wait until every session has ended."""
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        for username in list(self.tasks):
+            await self.remove(username)
+        # The clients share this HTTP client, so it is closed once here instead of by each client.
+        await self.http.aclose()
+
+    async def _run(self, username: str, watcher: AsyncPlaybackWatcher, max_duration: timedelta | None) -> None:
+        # One failing session must not take the others down.
+        while not watcher.stopped:
+            try:
+                await watcher.run(max_duration=max_duration)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Session of %s failed, restarting in %s s', username, RESTART_DELAY_S)
+                await asyncio.sleep(RESTART_DELAY_S)
+
+
+def parse_policies(spec: str) -> list[Policy]:
+    """New policy instances from a spec like `mid:10,end`, see `POLICIES`."""
+    policies = []
+    for item in spec.split(','):
+        name, *args = item.split(':', 1)
+        if name not in POLICIES:
+            raise ValueError(f'Unknown policy {name!r}, expected one of {", ".join(POLICIES)}')
+        policies.append(POLICIES[name](*args))
+    return policies
+
+
+def parse_sessions(args: list[str]) -> dict[str, list[Policy]]:
+    """Policies by username from command line arguments like `alice=mid:10,end`."""
+    sessions = {}
+    for arg in args:
+        username, _, spec = arg.partition('=')
+        sessions[username] = parse_policies(spec or DEFAULT_POLICIES)
+    return sessions
+
+
+async def main(sessions: dict[str, list[Policy]]) -> None:
+    async with PlaybackDaemon() as daemon:
+        for username, policies in sessions.items():
+            await daemon.add(username, policies)
+        try:
+            await daemon.wait()
+        finally:
+            print(daemon.metrics.format())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_sessions(sys.argv[1:])))
@@ -0,0 +1,85 @@
+import time
+from typing import Iterable
+
+from mytypes.types import PlaybackState
+
+# Wake up this long before an event to poll a fresh position, then poll again right after the event.
+DEFAULT_LEAD_S = 1.5
+# Poll at least this often while playing, to notice seeks, skips and pauses made elsewhere.
+DEFAULT_MAX_INTERVAL_S = 20
+DEFAULT_MIN_INTERVAL_S = 0.2
+# The poll right after an event lands this long after it, so the event has happened by then.
+EVENT_MARGIN_S = 0.05
+DEFAULT_IDLE_INTERVAL_S = 2
+DEFAULT_MAX_IDLE_INTERVAL_S = 30
+DEFAULT_IDLE_BACKOFF = 1.5
+
+
+class PlaybackScheduler:
+    """
+    Decides how long a playback loop sleeps before polling `current_playback` again.
+
+    Instead of polling every few seconds, the loop sleeps until shortly before the next event it cares
+    about (e.g. the middle of the song, or a moment before its end), polls once to correct for drift,
+    and then sleeps until just after the event. The end of the track is always an event, so track changes
+    are noticed right away. While nothing is playing, the interval backs off exponentially.
+
+        scheduler = PlaybackScheduler()
+        while True:
+            state = sp.current_playback()
+            ...
+            sleep(scheduler.delay(state, events_ms=[state.item.duration_ms // 2]))
+    """
+
+    def __init__(
+        self,
+        lead_s: float = DEFAULT_LEAD_S,
+        max_interval_s: float = DEFAULT_MAX_INTERVAL_S,
+        min_interval_s: float = DEFAULT_MIN_INTERVAL_S,
+        idle_interval_s: float = DEFAULT_IDLE_INTERVAL_S,
+        max_idle_interval_s: float = DEFAULT_MAX_IDLE_INTERVAL_S,
+        idle_backoff: float = DEFAULT_IDLE_BACKOFF,
+    ) -> None:
+        self.lead_s = lead_s
+        self.max_interval_s = max_interval_s
+        self.min_interval_s = min_interval_s
+        self.idle_interval_s = idle_interval_s
+        self.max_idle_interval_s = max_idle_interval_s
+        self.idle_backoff = idle_backoff
+        self.current_idle_interval_s: float | None = None
+        # Number of delays handed out, i.e. polls made by the loop.
+        self.polls = 0
+
+    def delay(self, state: PlaybackState | None, events_ms: Iterable[int] = ()) -> float:
+        """
+        Seconds to sleep before the next poll, given the latest playback state and
+        the positions (ms into the current track) of the events the loop reacts to.
+        """
+        self.polls += 1
+        if state is None or not state.is_playing or state.item is None or state.progress_ms is None:
+            return self._idle_delay()
+        self.current_idle_interval_s = None
+
+        progress_ms = state.progress_ms
+        upcoming_ms = [event_ms for event_ms in events_ms if event_ms > progress_ms]
+        next_event_ms = min(upcoming_ms, default=state.item.duration_ms)
+        until_s = (min(next_event_ms, state.item.duration_ms) - progress_ms) / 1000
+
+        if until_s > self.lead_s:
+            delay = until_s - self.lead_s
+        else:
+            delay = until_s + EVENT_MARGIN_S
+        return min(max(delay, self.min_interval_s), self.max_interval_s)
+
+    def _idle_delay(self) -> float:
+        if self.current_idle_interval_s is None:
+            self.current_idle_interval_s = self.idle_interval_s
+        else:
+            self.current_idle_interval_s = min(
+                self.current_idle_interval_s * self.idle_backoff,
+                self.max_idle_interval_s,
+            )
+        return self.current_idle_interval_s
+
+    def sleep(self, state: PlaybackState | None, events_ms: Iterable[int] = ()) -> None:
+        time.sleep(self.delay(state, events_ms))
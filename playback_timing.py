@@ -0,0 +1,153 @@
+"""
+Time playback commands against the position of the track on Spotify's side.
+
+A `PlaybackState` describes the track position when Spotify read it, and by the time it arrives the track has
+moved on. Its `timestamp` is when the playback state last changed (a resume, seek or track change), not when it
+was read, so it cannot tell how old the position is. `PlaybackClock` measures the round trip of each request
+instead: the position was read about halfway through it, and a command takes effect about half a round trip
+after it is sent, so commands can be sent early enough to take effect at a given track position.
+"""
+import time
+import bisect
+import asyncio
+from typing import Any, Awaitable, Callable, Sequence, TypeVar
+
+from mytypes.types import PlaybackState
+
+T = TypeVar('T')
+
+# Weight of a new round trip in the smoothed round trip time, as in TCP.
+RTT_ALPHA = 0.125
+ERROR_BUCKETS_MS = (-500, -250, -100, -50, -20, 0, 20, 50, 100, 250, 500)
+
+
+class TimingHistogram:
+    """Counts of timing errors in ms, bucketed by the upper bounds in `bounds_ms`."""
+
+    def __init__(self, bounds_ms: Sequence[int] = ERROR_BUCKETS_MS) -> None:
+        self.bounds_ms = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.samples: list[float] = []
+
+    def add(self, error_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds_ms, error_ms)] += 1
+        self.samples.append(error_ms)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def format(self) -> str:
+        if not self.samples:
+            return 'No timing errors recorded'
+        mean_ms = sum(self.samples) / len(self.samples)
+        lines = [f'{len(self.samples)} samples, mean {mean_ms:+.0f} ms']
+        labels = [f'<= {bound:+} ms' for bound in self.bounds_ms] + [f' > {self.bounds_ms[-1]:+} ms']
+        for label, count in zip(labels, self.counts):
+            lines.append(f'{label:>12} {count:>5} {"#" * count}'.rstrip())
+        return '\n'.join(lines)
+
+
+class PlaybackClock:
+    """
+    Estimates of the round trip time of requests, and of when playback states were read, from timed requests.
+
+        clock = PlaybackClock()
+        state = clock.current_playback(sp)
+        clock.run_at(state, state.item.duration_ms - 1000, sp.pause_playback)
+    """
+
+    def __init__(self, rtt_alpha: float = RTT_ALPHA) -> None:
+        self.rtt_alpha = rtt_alpha
+        self.rtt_s: float | None = None
+        self.last_state: PlaybackState | None = None
+        self.last_read_s: float | None = None
+        self.errors = TimingHistogram()
+
+    @property
+    def latency_s(self) -> float:
+        """Predicted time from sending a request until Spotify acts on it."""
+        return self.rtt_s / 2 if self.rtt_s is not None else 0
+
+    def observe_rtt(self, rtt_s: float) -> None:
+        if self.rtt_s is None:
+            self.rtt_s = rtt_s
+        else:
+            self.rtt_s += self.rtt_alpha * (rtt_s - self.rtt_s)
+
+    def timed(self, request: Callable[[], T]) -> tuple[T, float, float]:
+        """Result of `request`, and the local times it was sent and received."""
+        sent_s = time.time()
+        result = request()
+        received_s = time.time()
+        self.observe_rtt(received_s - sent_s)
+        return result, sent_s, received_s
+
+    async def timed_async(self, request: Callable[[], Awaitable[T]]) -> tuple[T, float, float]:
+        sent_s = time.time()
+        result = await request()
+        received_s = time.time()
+        self.observe_rtt(received_s - sent_s)
+        return result, sent_s, received_s
+
+    def current_playback(self, client: Any, **kwargs: Any) -> PlaybackState | None:
+        """`client.current_playback(**kwargs)`, remembering when the state was read."""
+        state, sent_s, received_s = self.timed(lambda: client.current_playback(**kwargs))
+        return self.observe_playback(state, sent_s, received_s)
+
+    async def current_playback_async(self, client: Any, **kwargs: Any) -> PlaybackState | None:
+        """Same as `current_playback` for an `AsyncSpotipyClient`."""
+        state, sent_s, received_s = await self.timed_async(lambda: client.current_playback(**kwargs))
+        return self.observe_playback(state, sent_s, received_s)
+
+    def observe_playback(self, state: PlaybackState | None, sent_s: float, received_s: float) -> PlaybackState | None:
+        if state is None:
+            return state
+        # Read about halfway through the round trip, i.e. `progress_ms` is half a round trip old on arrival.
+        self.last_state = state
+        self.last_read_s = (sent_s + received_s) / 2
+        return state
+
+    def read_at_s(self, state: PlaybackState) -> float:
+        """Local time at which `state` was read, assuming it was just received if it is not the latest state."""
+        if state is self.last_state and self.last_read_s is not None:
+            return self.last_read_s
+        return time.time() - self.latency_s
+
+    def local_time_at(self, state: PlaybackState, position_ms: int) -> float:
+        """Local time at which playback reaches `position_ms` of the current track, if it keeps playing."""
+        return self.read_at_s(state) + (position_ms - (state.progress_ms or 0)) / 1000
+
+    def position_ms(self, state: PlaybackState, now_s: float | None = None) -> int:
+        """Estimated current position in the track."""
+        progress_ms = state.progress_ms or 0
+        if not state.is_playing:
+            return progress_ms
+        now_s = time.time() if now_s is None else now_s
+        return progress_ms + int((now_s - self.read_at_s(state)) * 1000)
+
+    def send_delay_s(self, state: PlaybackState, position_ms: int) -> float:
+        """Seconds to wait before sending a command that should take effect at `position_ms`."""
+        send_at_s = self.local_time_at(state, position_ms) - self.latency_s
+        return max(send_at_s - time.time(), 0)
+
+    def run_at(self, state: PlaybackState, position_ms: int, command: Callable[[], T]) -> T:
+        """Send `command` early by the predicted latency, so it takes effect at `position_ms`."""
+        time.sleep(self.send_delay_s(state, position_ms))
+        result, _, _ = self.timed(command)
+        return result
+
+    async def run_at_async(self, state: PlaybackState, position_ms: int, command: Callable[[], Awaitable[T]]) -> T:
+        await asyncio.sleep(self.send_delay_s(state, position_ms))
+        result, _, _ = await self.timed_async(command)
+        return result
+
+    def record_error(self, position_ms: int, state: PlaybackState | None) -> float | None:
+        """
+        Record how far from `position_ms` playback stopped, given a state read after pausing.
+        Positive errors are late.
+        """
+        if state is None or state.is_playing or state.progress_ms is None:
+            return None
+        error_ms = state.progress_ms - position_ms
+        self.errors.add(error_ms)
+        return error_ms
@@ -0,0 +1,332 @@
+"""
+One polling loop for everything that reacts to playback.
+
+`PlaybackWatcher` polls `current_playback` as rarely as the policies allow and hands every state to each
+policy, which returns the actions it wants taken. Policies can be combined freely and share the same
+requests, e.g. pausing in the middle of every song while also stopping after an hour:
+
+    watcher = PlaybackWatcher(sp, [MidSongPause(pause_s=5), SleepTimer(after_s=HOUR)])
+    watcher.run()
+
+The policies and the scheduling live in `BasePlaybackWatcher`, `playback_daemon.AsyncPlaybackWatcher` runs them
+with an async client instead.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Literal, NamedTuple
+
+from requests import RequestException
+from spotipy.exceptions import SpotifyException
+
+from mytypes.types import PlaybackState
+from spotipy_client import SpotipyClient
+from playback_scheduler import PlaybackScheduler
+from playback_timing import PlaybackClock
+
+
+@dataclass(kw_only=True, frozen=True)
+class Pause:
+    """Pause playback, at a position in the current track if `at_ms` is set, and resume after `resume_after_s`."""
+    at_ms: int | None = None
+    resume_after_s: float | None = None
+
+
+@dataclass(kw_only=True, frozen=True)
+class SetRepeat:
+    state: Literal['track', 'context', 'off']
+
+
+@dataclass(kw_only=True, frozen=True)
+class Stop:
+    """Stop watching."""
+
+
+Action = Pause | SetRepeat | Stop
+
+
+class Playing(NamedTuple):
+    """The track that is playing and where, from a `PlaybackState`."""
+    uri: str
+    progress_ms: int
+    duration_ms: int
+
+
+def _playing(state: PlaybackState | None) -> Playing | None:
+    """What is playing, None if playback is paused or has no track or position."""
+    if state is None or not state.is_playing or state.item is None or state.progress_ms is None:
+        return None
+    return Playing(uri=state.item.uri, progress_ms=state.progress_ms, duration_ms=state.item.duration_ms)
+
+
+class Policy:
+    """Reacts to playback. Subclasses override the hooks they need."""
+
+    # Policies that only wait for `wake_at_s` set this to False, so nothing is polled until then.
+    watches_playback = True
+
+    def on_track_change(self, playing: Playing, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        """Called before `actions` when a new track is playing, to reset per-track state."""
+        return []
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        """Actions to take given the latest state, None if nothing is playing on any device."""
+        return []
+
+    def events_ms(self, playing: Playing) -> list[int]:
+        """Positions in the current track at which this policy wants a fresh state."""
+        return []
+
+    def wake_at_s(self) -> float | None:
+        """Local time at which this policy wants a fresh state, regardless of playback."""
+        return None
+
+
+class MidSongPause(Policy):
+    """Pause once in each song when it reaches `at` of its duration, and resume after `pause_s`."""
+
+    def __init__(self, pause_s: float = 5, at: float = 0.5) -> None:
+        self.pause_s = pause_s
+        self.at = at
+        self.has_paused = False
+
+    def on_track_change(self, playing: Playing, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        self.has_paused = False
+        return []
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        playing = _playing(state)
+        if self.has_paused or playing is None:
+            return []
+        if playing.progress_ms >= playing.duration_ms * self.at:
+            self.has_paused = True
+            return [Pause(resume_after_s=self.pause_s)]
+        return []
+
+    def events_ms(self, playing: Playing) -> list[int]:
+        return [] if self.has_paused else [int(playing.duration_ms * self.at)]
+
+
+class EndOfSongPause(Policy):
+    """Pause each song `before_end_s` before it ends."""
+
+    def __init__(self, before_end_s: float = 1) -> None:
+        self.before_end_s = before_end_s
+        self.has_paused = False
+
+    def on_track_change(self, playing: Playing, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        self.has_paused = False
+        return []
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        playing = _playing(state)
+        if self.has_paused or playing is None:
+            return []
+        pause_at_ms = self._pause_at_ms(playing)
+        # The watcher wakes up `lead_s` before the pause and waits for the exact moment itself.
+        if pause_at_ms - playing.progress_ms <= watcher.scheduler.lead_s * 1000:
+            self.has_paused = True
+            return [Pause(at_ms=pause_at_ms)]
+        return []
+
+    def events_ms(self, playing: Playing) -> list[int]:
+        return [] if self.has_paused else [self._pause_at_ms(playing)]
+
+    def _pause_at_ms(self, playing: Playing) -> int:
+        return playing.duration_ms - int(self.before_end_s * 1000)
+
+
+class RepeatN(Policy):
+    """Play each song `times` times in a row: track repeat stays on until its last play has begun."""
+
+    # The song has started over when its progress drops back from this close to its end.
+    END_WINDOW_S = 5
+
+    def __init__(self, times: int = 2) -> None:
+        self.times = times
+        # The play of the current song in progress, from 1.
+        self.count = 1
+        self.near_end = False
+
+    def on_track_change(self, playing: Playing, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        self.count = 1
+        self.near_end = False
+        return [SetRepeat(state='track' if self.times > 1 else 'off')]
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        playing = _playing(state)
+        if self.count >= self.times or playing is None:
+            return []
+        if playing.duration_ms - playing.progress_ms <= self.END_WINDOW_S * 1000:
+            self.near_end = True
+            return []
+        if not self.near_end:
+            return []
+        # The same song started over, which `on_track_change` does not see.
+        self.near_end = False
+        self.count += 1
+        return [SetRepeat(state='off')] if self.count >= self.times else []
+
+    def events_ms(self, playing: Playing) -> list[int]:
+        # The end of the track is always polled, which catches the restart.
+        return [] if self.count >= self.times else [playing.duration_ms - self.END_WINDOW_S * 1000]
+
+
+class SleepTimer(Policy):
+    """Pause playback and stop watching after `after_s`."""
+
+    watches_playback = False
+
+    def __init__(self, after_s: float) -> None:
+        self.deadline_s = time.time() + after_s
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        if time.time() < self.deadline_s:
+            return []
+        return [Pause(), Stop()] if state is not None and state.is_playing else [Stop()]
+
+    def wake_at_s(self) -> float | None:
+        return self.deadline_s
+
+
+class ShowProgress(Policy):
+    """Print a progress bar of the current song."""
+
+    def actions(self, state: PlaybackState | None, watcher: 'BasePlaybackWatcher') -> list[Action]:
+        playing = _playing(state)
+        if playing is not None:
+            progress_percent = int((playing.progress_ms / playing.duration_ms) * 100)
+            print(f'|{"="*progress_percent:<100}|', end='\r')
+        return []
+
+
+class BasePlaybackWatcher:
+    """
+    What every playback watcher does between polls: hand the state to each of `policies`, and work out when to
+    poll next. Subclasses poll and carry out the actions, with a blocking or an async client.
+    """
+
+    def __init__(
+        self,
+        policies: list[Policy],
+        scheduler: PlaybackScheduler | None = None,
+        clock: PlaybackClock | None = None,
+    ) -> None:
+        self.policies = policies
+        self.scheduler = scheduler or PlaybackScheduler()
+        self.clock = clock or PlaybackClock()
+        self.current_track: str | None = None
+        self.stopped = False
+
+    def react(self, state: PlaybackState | None) -> list[Action]:
+        """Actions of every policy for `state`."""
+        actions: list[Action] = []
+        playing = _playing(state)
+        if playing is not None and playing.uri != self.current_track:
+            self.current_track = playing.uri
+            for policy in self.policies:
+                actions += policy.on_track_change(playing, self)
+        for policy in self.policies:
+            actions += policy.actions(state, self)
+        return actions
+
+    def plan(self, actions: list[Action]) -> list[Pause | SetRepeat]:
+        """The `actions` that need a request, in order, pausing at most once. A `Stop` stops the watcher here."""
+        planned: list[Pause | SetRepeat] = []
+        has_paused = False
+        for action in actions:
+            if isinstance(action, Stop):
+                self.stopped = True
+            elif isinstance(action, SetRepeat):
+                planned.append(action)
+            elif isinstance(action, Pause) and not has_paused:
+                has_paused = True
+                planned.append(action)
+        return planned
+
+    def idle_s(self, deadline_s: float | None = None) -> float:
+        """
+        Seconds to wait before polling at all, while no policy watches playback and they are waiting for their
+        `wake_at_s`, e.g. a `SleepTimer` alone. At most until `deadline_s`.
+        """
+        if any(policy.watches_playback for policy in self.policies):
+            return 0
+        wake_ats = [wake_at_s for policy in self.policies if (wake_at_s := policy.wake_at_s()) is not None]
+        if deadline_s is not None:
+            wake_ats.append(deadline_s)
+        return max(min(wake_ats) - time.time(), 0) if wake_ats else 0
+
+    def delay(self, state: PlaybackState | None) -> float:
+        """Seconds until the next poll."""
+        events_ms = []
+        playing = _playing(state)
+        if playing is not None:
+            for policy in self.policies:
+                events_ms += policy.events_ms(playing)
+        delay = self.scheduler.delay(state, events_ms=events_ms)
+        for policy in self.policies:
+            wake_at_s = policy.wake_at_s()
+            if wake_at_s is not None:
+                delay = min(delay, max(wake_at_s - time.time(), 0))
+        return delay
+
+
+class PlaybackWatcher(BasePlaybackWatcher):
+    """Polls playback once for all `policies` and carries out the actions they return."""
+
+    def __init__(
+        self,
+        client: SpotipyClient,
+        policies: list[Policy],
+        scheduler: PlaybackScheduler | None = None,
+        clock: PlaybackClock | None = None,
+    ) -> None:
+        super().__init__(policies, scheduler=scheduler, clock=clock)
+        self.client = client
+
+    def poll(self) -> PlaybackState | None:
+        """Fetch the playback state once, let every policy react to it and return the latest state."""
+        try:
+            state = self.clock.current_playback(self.client)
+        except (SpotifyException, RequestException):
+            # This could happen if slow internet connection etc.
+            return None
+        return self.execute(self.react(state), state)
+
+    def execute(self, actions: list[Action], state: PlaybackState | None) -> PlaybackState | None:
+        """Carry out `actions` in order, pausing at most once, and return the latest known state."""
+        for action in self.plan(actions):
+            try:
+                if isinstance(action, SetRepeat):
+                    self.client.repeat(state=action.state)
+                else:
+                    state = self.pause(action, state)
+            except (SpotifyException, RequestException):
+                pass
+        return state
+
+    def pause(self, action: Pause, state: PlaybackState | None) -> PlaybackState | None:
+        if action.at_ms is not None and state is not None:
+            self.clock.run_at(state, action.at_ms, self.client.pause_playback)
+            # Check where it actually paused.
+            state = self.clock.current_playback(self.client)
+            self.clock.record_error(action.at_ms, state)
+        else:
+            self.client.pause_playback()
+        if action.resume_after_s is not None:
+            time.sleep(action.resume_after_s)
+            self.client.start_playback()
+        return state
+
+    def run(self, max_duration: timedelta | None = None) -> None:
+        """Poll until a policy stops the watcher, or `max_duration` has passed."""
+        deadline_s = time.time() + max_duration.total_seconds() if max_duration is not None else None
+        while not self.stopped:
+            if deadline_s is not None and time.time() >= deadline_s:
+                return
+            if idle_s := self.idle_s(deadline_s):
+                time.sleep(idle_s)
+                continue
+            state = self.poll()
+            if not self.stopped:
+                time.sleep(self.delay(state))
@@ -0,0 +1,162 @@
+import re
+import time
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+# Spotify does not publish its limit, it is calculated over a rolling 30 second window per app.
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+# Endpoint budgets adapt between these bounds (requests per second).
+MIN_ENDPOINT_RATE = 0.5
+MAX_ENDPOINT_RATE = DEFAULT_RATE
+# Additive increase per successful request, multiplicative decrease per 429.
+RATE_INCREASE = 0.1
+RATE_DECREASE = 0.5
+# Used when a 429 response has no (parsable) Retry-After header.
+DEFAULT_RETRY_AFTER_S = 1.0
+
+_ID_RE = re.compile(r'[0-9A-Za-z]{22}')
+
+
+def endpoint_key(method: str, url: str) -> str:
+    """
+    Group requests by endpoint by replacing IDs in the path, e.g.
+    GET https://api.spotify.com/v1/playlists/37i9dQZEVXcQ9COmYvdajy/tracks?offset=100 -> GET playlists/{id}/tracks
+    """
+    segments = urlsplit(url).path.strip('/').split('/')
+    if segments and segments[0] == 'v1':
+        segments = segments[1:]
+    for i, segment in enumerate(segments):
+        if _ID_RE.fullmatch(segment) or (i > 0 and segments[i - 1] == 'users'):
+            segments[i] = '{id}'
+    return f'{method.upper()} {"/".join(segments)}'
+
+
+def parse_retry_after(value: str | None) -> float:
+    try:
+        return max(float(value), 0) if value is not None else DEFAULT_RETRY_AFTER_S
+    except ValueError:
+        return DEFAULT_RETRY_AFTER_S
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+    Tokens may go negative, the debt is the queue of requests waiting for a slot.
+    Not thread safe, guarded by `RequestScheduler`.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take a token, returns the delay in seconds until it may be used."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0)
+
+
+@dataclass(kw_only=True)
+class SchedulerMetrics:
+    queue_depth: int
+    max_queue_depth: int
+    requests: int
+    waited_requests: int
+    total_wait_s: float
+    max_wait_s: float
+    rate_limited: int
+    endpoint_rates: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def mean_wait_s(self) -> float:
+        return self.total_wait_s / self.waited_requests if self.waited_requests else 0.0
+
+
+class RequestScheduler:
+    """
+    Paces all requests sent through it with a global token bucket and one adaptive bucket per endpoint.
+    Sessions from `http_session.build_session` share `http_session.DEFAULT_SCHEDULER` unless given their own.
+    A 429 halves the endpoint's budget and blocks every request until `Retry-After` has passed,
+    since Spotify's rate limit applies to the whole app. Successful requests slowly raise the budget again.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST) -> None:
+        self._lock = threading.Lock()
+        self._global = TokenBucket(rate=rate, capacity=burst)
+        self._endpoints: dict[str, TokenBucket] = {}
+        self._blocked_until = 0.0
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._requests = 0
+        self._waited_requests = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+        self._rate_limited = 0
+
+    def acquire(self, endpoint: str) -> float:
+        """Block until a request to `endpoint` may be sent, returns the time waited in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._endpoint_bucket(endpoint)
+            delay = max(self._global.reserve(now), bucket.reserve(now), self._blocked_until - now)
+            self._requests += 1
+            if delay > 0:
+                self._queue_depth += 1
+                self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        if delay <= 0:
+            return 0.0
+
+        time.sleep(delay)
+        with self._lock:
+            self._queue_depth -= 1
+            self._waited_requests += 1
+            self._total_wait_s += delay
+            self._max_wait_s = max(self._max_wait_s, delay)
+        return delay
+
+    def on_success(self, endpoint: str) -> None:
+        with self._lock:
+            bucket = self._endpoint_bucket(endpoint)
+            bucket.rate = min(bucket.rate + RATE_INCREASE, MAX_ENDPOINT_RATE)
+
+    def on_rate_limited(self, endpoint: str, retry_after_s: float) -> None:
+        with self._lock:
+            bucket = self._endpoint_bucket(endpoint)
+            bucket.rate = max(bucket.rate * RATE_DECREASE, MIN_ENDPOINT_RATE)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after_s)
+            self._rate_limited += 1
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._lock:
+            return SchedulerMetrics(
+                queue_depth=self._queue_depth,
+                max_queue_depth=self._max_queue_depth,
+                requests=self._requests,
+                waited_requests=self._waited_requests,
+                total_wait_s=self._total_wait_s,
+                max_wait_s=self._max_wait_s,
+                rate_limited=self._rate_limited,
+                endpoint_rates={endpoint: bucket.rate for endpoint, bucket in self._endpoints.items()},
+            )
+
+    def _endpoint_bucket(self, endpoint: str) -> TokenBucket:
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = TokenBucket(rate=MAX_ENDPOINT_RATE, capacity=self._global.capacity)
+        return self._endpoints[endpoint]
+
+
+class UnpacedScheduler(RequestScheduler):
+    """
+    Lets every request through right away, for replaying a cassette or talking to a local stub server,
+    where pacing would only add sleeps. Still counts the requests and 429 responses.
+    """
+
+    def acquire(self, endpoint: str) -> float:
+        with self._lock:
+            self._requests += 1
+        return 0.0
@@ -0,0 +1,133 @@
+"""
+Reorder a playlist in place with as few calls as possible.
+
+Tracks on the longest increasing subsequence of the current order (by target position) stay where they are,
+every other track is moved right after its predecessor in the target order. Tracks that are adjacent both
+now and in the target order are moved together as one range, so a nearly sorted playlist takes a handful of
+reorder calls. Callers may allow rewriting the playlist instead when moving would take more calls, at the cost
+of the dates the items were added.
+"""
+import math
+from bisect import bisect_left
+from dataclasses import dataclass
+from collections import defaultdict, deque
+from typing import Sequence
+
+from mytypes.types import PlaylistObject, PagedPlaylistTrackObject
+from mytypes.projection import Projection
+from spotipy_client import SpotipyClient
+
+# Items per call when the playlist is rewritten.
+REWRITE_BATCH_SIZE = 100
+
+SNAPSHOT_FIELDS = Projection(PlaylistObject, 'snapshot_id')
+URI_FIELDS = Projection(PagedPlaylistTrackObject, 'items.track.uri')
+
+
+@dataclass(kw_only=True, frozen=True)
+class Move:
+    """Arguments of one `playlist_reorder_items` call, positions are before the move."""
+    range_start: int
+    insert_before: int
+    range_length: int = 1
+
+
+def target_ranks(current: Sequence[str], target: Sequence[str]) -> list[int]:
+    """Position in `target` of each item in `current`, repeated items keep their relative order."""
+    if sorted(current) != sorted(target):
+        raise ValueError('The target order must contain exactly the items of the current order')
+    positions: dict[str, deque[int]] = defaultdict(deque)
+    for position, item in enumerate(target):
+        positions[item].append(position)
+    return [positions[item].popleft() for item in current]
+
+
+def longest_increasing_subsequence(values: Sequence[int]) -> set[int]:
+    """Indices of a longest strictly increasing subsequence of `values`, in O(n log n)."""
+    tails: list[int] = []  # Smallest last value of an increasing subsequence of each length.
+    tail_indices: list[int] = []
+    previous: list[int | None] = []
+    for i, value in enumerate(values):
+        length = bisect_left(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            tail_indices.append(i)
+        else:
+            tails[length] = value
+            tail_indices[length] = i
+        previous.append(tail_indices[length - 1] if length else None)
+
+    indices = set()
+    i = tail_indices[-1] if tail_indices else None
+    while i is not None:
+        indices.add(i)
+        i = previous[i]
+    return indices
+
+
+def plan_moves(current: Sequence[str], target: Sequence[str]) -> list[Move]:
+    """Range moves that turn `current` into `target`, to be applied in order."""
+    ranks = target_ranks(current, target)
+    kept = {ranks[i] for i in longest_increasing_subsequence(ranks)}
+
+    # Runs of tracks to move that are consecutive in the current and the target order.
+    blocks: list[tuple[int, int]] = []  # (first rank, length)
+    for i, rank in enumerate(ranks):
+        if rank in kept:
+            continue
+        if blocks and i > 0 and ranks[i - 1] == rank - 1 and rank - 1 not in kept:
+            first, length = blocks[-1]
+            blocks[-1] = (first, length + 1)
+        else:
+            blocks.append((rank, 1))
+
+    # In target order every block's predecessor is already in place, either kept or moved before it.
+    order = list(ranks)
+    moves = []
+    for first, length in sorted(blocks):
+        start = order.index(first)
+        insert_before = order.index(first - 1) + 1 if first else 0
+        moves.append(Move(range_start=start, insert_before=insert_before, range_length=length))
+        block = order[start:start + length]
+        del order[start:start + length]
+        position = insert_before - length if insert_before > start else insert_before
+        order[position:position] = block
+    return moves
+
+
+def apply_order(
+    client: SpotipyClient,
+    playlist_id: str,
+    target: Sequence[str],
+    current: Sequence[str] | None = None,
+    snapshot_id: str | None = None,
+    allow_rewrite: bool = False,
+) -> str | None:
+    """
+    Reorder the items of a playlist to `target`, a permutation of its current item URIs.
+    Each call is made against the snapshot returned by the previous one, so the moves are applied
+    to the order they were planned for. Returns the final snapshot id.
+
+    current: the current item URIs, fetched along with `snapshot_id` if None.
+    allow_rewrite: replace the items instead when that takes fewer calls than moving them.
+                   Rewriting resets the dates the items were added and the playlist's snapshot history.
+    """
+    if current is None:
+        snapshot_id = client.playlist(playlist_id=playlist_id, fields=SNAPSHOT_FIELDS).snapshot_id
+        current = [item.track.uri for item in client.iter_playlist_items(playlist_id=playlist_id, fields=URI_FIELDS)]
+
+    moves = plan_moves(current, target)
+    if allow_rewrite and len(moves) > math.ceil(len(target) / REWRITE_BATCH_SIZE):
+        replaced = client.playlist_replace_items(playlist_id=playlist_id, items=target[:REWRITE_BATCH_SIZE])
+        added = client.playlist_add_items_bulk(playlist_id=playlist_id, items=target[REWRITE_BATCH_SIZE:])
+        return added.snapshot_id or replaced['snapshot_id']
+
+    for move in moves:
+        snapshot_id = client.playlist_reorder_items(
+            playlist_id=playlist_id,
+            range_start=move.range_start,
+            insert_before=move.insert_before,
+            range_length=move.range_length,
+            snapshot_id=snapshot_id,
+        )['snapshot_id']
+    return snapshot_id
@@ -0,0 +1,71 @@
+import json
+import sqlite3
+import threading
+from typing import Any
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+DEFAULT_PATH = '.cache-responses.sqlite'
+
+
+@dataclass(kw_only=True)
+class StoredResponse:
+    etag: str
+    data: dict[str, Any]
+    # The object parsed from `data`, handed out again while the resource is unchanged. Not persisted.
+    parsed: Any = None
+
+
+class ResponseStore:
+    """
+    Responses with their ETag, keyed by resource (path and query parameters), for conditional requests:
+    the ETag is sent as If-None-Match, and a 304 Not Modified means the stored response is still current.
+    The ETag of a playlist changes with its snapshot_id, so the snapshot_id needs no check of its own.
+    Kept in memory, and in an SQLite file as well if `path` is given, so cron jobs can revalidate across runs.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self.responses: dict[str, StoredResponse] = {}
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection | None = None
+        if path:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, etag TEXT NOT NULL, data TEXT NOT NULL)'
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any]) -> str:
+        query = urlencode(sorted((k, v) for k, v in params.items() if v is not None))
+        return f'{url}?{query}' if query else url
+
+    def get(self, key: str) -> StoredResponse | None:
+        with self.lock:
+            if key not in self.responses and self.connection:
+                row = self.connection.execute(
+                    'SELECT etag, data FROM responses WHERE key = ?',
+                    (key, ),
+                ).fetchone()
+                if row:
+                    etag, data = row
+                    self.responses[key] = StoredResponse(etag=etag, data=json.loads(data))
+            return self.responses.get(key)
+
+    def put(self, key: str, etag: str, data: dict[str, Any], parsed: Any = None) -> StoredResponse:
+        stored = StoredResponse(etag=etag, data=data, parsed=parsed)
+        with self.lock:
+            self.responses[key] = stored
+            if self.connection:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO responses (key, etag, data) VALUES (?, ?, ?)',
+                    (key, etag, json.dumps(data)),
+                )
+                self.connection.commit()
+        return stored
+
+    def close(self) -> None:
+        if self.connection:
+            self.connection.close()
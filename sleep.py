@@ -1,7 +1,6 @@
-from time import sleep
-
 from utils import Scope
 from spotipy_client import SpotipyClient
+from playback_watcher import PlaybackWatcher, SleepTimer
 
 url = "https://api.spotify.com"
 
@@ -15,6 +14,11 @@ USER = 'emiltelstad'
 
 if __name__ == '__main__':
 
-    sleep(SLEEP_S)
-    sp = SpotipyClient(username=USER, scope=Scope.user_modify_playback_state)
-    sp.pause_playback()
+    sp = SpotipyClient(
+        username=USER,
+        scope=[
+            Scope.user_read_playback_state,
+            Scope.user_modify_playback_state,
+        ],
+    )
+    PlaybackWatcher(sp, [SleepTimer(after_s=SLEEP_S)]).run()
@@ -1,21 +1,58 @@
-from typing import Any, Iterable, Literal
+import time
+import threading
+from contextlib import AbstractContextManager, nullcontext
+from typing import Any, Iterable, Iterator, Literal, TypeVar
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 
 import spotipy
+import requests
 from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyClientCredentials
 
-from utils import scope_builder
+from utils import chunks, spotify_id, scope_builder
+from audio_features_cache import AudioFeaturesCache
+from response_store import ResponseStore
+from cassette import Cassette
+from http_session import DEFAULT_TIMEOUT, build_session
+from rate_limit import RequestScheduler, UnpacedScheduler
+from metrics import ApiMetrics
+from token_manager import TokenManager
+from mytypes.decode import fast as fast_decode, lazy as lazy_decode, loads
+from mytypes.projection import Projection, fields_param, with_field
+from mytypes.identity import IdentityMap, detached
 from mytypes.types import (
     PagedSimplifiedEpisodeObject,
+    SimplifiedEpisodeObject,
     Show,
     ImageObject,
     PlaybackState,
     PlaylistObject,
     AudioFeaturesObject,
+    PlaylistTrackObject,
     PagedPlaylistTrackObject,
     PagedSimplifiedPlaylistObject,
 )
 
+T = TypeVar('T')
+
+
+@dataclass(kw_only=True)
+class BulkAddResult:
+    """Outcome of `SpotipyClient.playlist_add_items_bulk`, one entry per batch."""
+    snapshot_ids: list[str] = field(default_factory=list)
+    batch_sizes: list[int] = field(default_factory=list)
+    batch_latencies_s: list[float] = field(default_factory=list)
+
+    @property
+    def snapshot_id(self) -> str | None:
+        """Snapshot id of the playlist after the last batch."""
+        return self.snapshot_ids[-1] if self.snapshot_ids else None
+
+    @property
+    def total(self) -> int:
+        return sum(self.batch_sizes)
+
 
 class SpotipyClient:
     """
@@ -25,19 +62,158 @@ class SpotipyClient:
     SPOTIPY_REDIRECT_URI=...
     """
 
+    # Process-level registry of clients, see `shared`.
+    _registry: dict[tuple[str | None, str | None], 'SpotipyClient'] = {}
+    _registry_lock = threading.Lock()
+
     def __init__(
         self,
         username: str | None = None,
         scope: str | list[str] | None = None,
+        session: requests.Session | None = None,
+        requests_timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+        lazy: bool = False,
+        fast: bool = False,
+        identity_map: IdentityMap | None = None,
+        response_store: ResponseStore | None = None,
+        api_prefix: str | None = None,
+        access_token: str | None = None,
+        cassette: Cassette | None = None,
     ) -> None:
+        """
+        session: HTTP session to send requests through, a pooled keep-alive session is built if None.
+                 Pass the same session to several clients to share its connection pool.
+        requests_timeout: seconds, or (connect, read) seconds, before a request is abandoned.
+        lazy: decode nested objects of responses on first attribute access instead of up front.
+        fast: decode responses with compiled decoders, see `mytypes.decode.fast`. The hottest endpoints
+              (playlist, playlist_items, show_episodes, audio_features, current_playback) then also
+              parse the raw response body themselves instead of going through spotipy.
+        response_store: revalidate playlists with their ETag, an unchanged playlist is answered with
+                        304 Not Modified and the object parsed last time is returned.
+        identity_map: share albums, artists and images between decoded responses, see `mytypes.identity`.
+                      Pass an `IdentityMap()`, or the same one to several clients to share it.
+        api_prefix: base URL of the API, e.g. the one of `benchmarks.stub_server`. Spotify's if None.
+        access_token: send this token instead of authenticating, `username` and `scope` are then ignored.
+        cassette: record every request and response to it, or answer requests from it, see `cassette`.
+                  No authentication is needed to replay, but `username` must be the recorded one.
+                  Replays are not rate limited, unless through a `session` that is.
+        """
+        if lazy and fast:
+            raise ValueError('Choose either lazy or fast decoding')
         self.username = username
-        if username:
-            scope = scope_builder(scope)
-            token = spotipy.util.prompt_for_user_token(username=username, scope=scope)
-            self.sp = spotipy.Spotify(auth=token)
+        self.lazy = lazy
+        self.fast = fast
+        self.identity_map = identity_map
+        self.response_store = response_store
+        if session is None and cassette is not None and cassette.mode == 'replay':
+            # Replay as fast as the cassette allows, see `Cassette.load`.
+            session = build_session(scheduler=UnpacedScheduler())
+        self.session = session or build_session()
+        # Sessions from `build_session` pace requests through a scheduler, see `scheduler.metrics()`.
+        self.scheduler: RequestScheduler | None = getattr(self.session, 'scheduler', None)
+        # And record them, see `metrics`. Other sessions record nothing.
+        self.metrics: ApiMetrics = getattr(self.session, 'metrics', None) or ApiMetrics()
+        self.cassette = cassette
+        if cassette is not None:
+            cassette.mount(self.session)
+            if cassette.mode == 'replay':
+                # Any token will do, the recorded requests are matched without their headers.
+                access_token = access_token or 'replay'
+        if access_token:
+            self.sp = spotipy.Spotify(
+                auth=access_token,
+                requests_session=self.session,
+                requests_timeout=requests_timeout,
+            )
+        elif username:
+            self.token_manager = TokenManager(
+                username=username,
+                scope=scope_builder(scope),
+                requests_session=self.session,
+            )
+            self.sp = spotipy.Spotify(
+                auth_manager=self.token_manager,
+                requests_session=self.session,
+                requests_timeout=requests_timeout,
+            )
         else:
-            auth_manager = SpotifyClientCredentials()
-            self.sp = spotipy.Spotify(auth_manager=auth_manager)
+            auth_manager = SpotifyClientCredentials(requests_session=self.session)
+            self.sp = spotipy.Spotify(
+                auth_manager=auth_manager,
+                requests_session=self.session,
+                requests_timeout=requests_timeout,
+            )
+        if api_prefix:
+            self.sp.prefix = api_prefix
+
+    def _parse(self, cls: type[T], data: dict[str, Any]) -> T:
+        with self._identity_map_active():
+            if self.fast:
+                return fast_decode(cls, data)
+            return lazy_decode(cls, data) if self.lazy else cls(**data)
+
+    def _identity_map_active(self) -> AbstractContextManager:
+        return self.identity_map.active() if self.identity_map is not None else nullcontext()
+
+    def _get(self, url: str, **params: Any) -> Any:
+        """ GET a URL, or an endpoint relative to the API prefix, the way `self.sp` does,
+            but the body is parsed with `mytypes.decode.loads`. Used when decoding fast.
+        """
+        response = self._get_response(url, **params)
+        return loads(response.content) if response.content else None
+
+    def _get_response(self, url: str, headers: dict[str, str] | None = None, **params: Any) -> requests.Response:
+        params = {k: v for k, v in params.items() if v is not None}
+        headers = {**self.sp._auth_headers(), **(headers or {})}
+        response = self.session.get(
+            url if url.startswith('http') else self.sp.prefix + url,
+            params=params,
+            headers=headers,
+            timeout=self.sp.requests_timeout,
+        )
+        if not response.ok:
+            try:
+                error = loads(response.content).get('error', {})
+                msg, reason = error.get('message'), error.get('reason')
+            except ValueError:
+                msg, reason = response.text or None, None
+            raise SpotifyException(
+                response.status_code,
+                -1,
+                f'{response.url}:\n {msg}',
+                reason=reason,
+                headers=response.headers,
+            )
+        return response
+
+    def _next(self, result: dict[str, Any]) -> dict[str, Any] | None:
+        if self.fast:
+            return self._get(result['next']) if result.get('next') else None
+        return self.sp.next(result)
+
+    def _parse_fields(self, cls: type[T], data: dict[str, Any], fields: str | Projection | None) -> T:
+        # Filtered responses lack the fields that were not selected, so they are decoded into partial objects,
+        # which must not be shared with full reads of the same entities.
+        if not fields:
+            return self._parse(cls, data)
+        with detached():
+            return fields.parse(data) if isinstance(fields, Projection) else lazy_decode(cls, data)
+
+    @classmethod
+    def shared(
+        cls,
+        username: str | None = None,
+        scope: str | list[str] | None = None,
+    ) -> 'SpotipyClient':
+        """
+        Returns the client already constructed in this process for `username` and `scope`,
+        constructing it on first use. Reuses its authenticated session and open connections.
+        """
+        key = (username, scope_builder(scope))
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(username=username, scope=scope)
+            return cls._registry[key]
 
     def track(
         self,
@@ -204,7 +380,7 @@ class SpotipyClient:
                            takes precedence. If neither market nor user country are
                            provided, the content is considered unavailable for the client.
         """
-        return Show(**self.sp.show(show_id=show_id, market=market))
+        return self._parse(Show, self.sp.show(show_id=show_id, market=market))
 
     def shows(
         self,
@@ -248,14 +424,47 @@ class SpotipyClient:
                            provided, the content is considered unavailable for the client.
         """
 
-        return PagedSimplifiedEpisodeObject(
-            **self.sp.show_episodes(
-                show_id=show_id,
-                limit=limit,
-                offset=offset,
-                market=market,
-            )
-        )
+        if self.fast:
+            data = self._get(f'shows/{spotify_id(show_id)}/episodes', limit=limit, offset=offset, market=market)
+        else:
+            data = self.sp.show_episodes(show_id=show_id, limit=limit, offset=offset, market=market)
+        return self._parse(PagedSimplifiedEpisodeObject, data)
+
+    def all_show_episodes(
+        self,
+        show_id: str,
+        max_workers: int = 8,
+        market: str | None = None,
+        total_episodes: int | None = None,
+    ) -> list[SimplifiedEpisodeObject]:
+        """ Get all episodes of a show.
+
+            All pages are requested in parallel and reassembled in order.
+
+            Parameters:
+                - show_id - the show ID, URI or URL
+                - max_workers - maximum number of concurrent page requests
+                - market - an ISO 3166-1 alpha-2 country code.
+                - total_episodes - `Show.total_episodes` if already known. Otherwise the
+                                   first page is fetched up front to learn the total.
+        """
+        limit = 50  # Max episode retrieval per page.
+
+        def fetch(offset: int) -> PagedSimplifiedEpisodeObject:
+            return self.show_episodes(show_id=show_id, limit=limit, offset=offset, market=market)
+
+        episodes: list[SimplifiedEpisodeObject] = []
+        if total_episodes is None:
+            first_page = fetch(offset=0)
+            episodes.extend(first_page.items)
+            offsets = range(limit, first_page.total, limit)
+        else:
+            offsets = range(0, total_episodes, limit)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for page in executor.map(fetch, offsets):
+                episodes.extend(page.items)
+        return episodes
 
     def episode(
         self,
@@ -368,7 +577,7 @@ class SpotipyClient:
     def playlist(
         self,
         playlist_id: str,
-        fields: Iterable[str] | None = None,
+        fields: str | Projection[PlaylistObject] | None = None,
         market: str | None = None,
         additional_types: Iterable[str] = ("track", ),
     ) -> PlaylistObject:
@@ -378,25 +587,79 @@ class SpotipyClient:
 
             Parameters:
                 - playlist - the id of the playlist
-                - fields - which fields to return
+                - fields - which fields to return, as a string or a `Projection` of `PlaylistObject`.
+                           The result is a partial object with only those fields.
                 - market - An ISO 3166-1 alpha-2 country code or the
                            string from_token.
                 - additional_types - list of item types to return.
                                      valid types are: track and episode
         """
-        return PlaylistObject(
-            **self.sp.playlist(
+        if self.response_store is not None:
+            return self._playlist_conditional(
+                store=self.response_store,
                 playlist_id=playlist_id,
                 fields=fields,
                 market=market,
                 additional_types=additional_types,
             )
-        )
+        if self.fast:
+            data = self._get(
+                f'playlists/{spotify_id(playlist_id)}',
+                fields=fields_param(PlaylistObject, fields),
+                market=market,
+                additional_types=','.join(additional_types),
+            )
+        else:
+            data = self.sp.playlist(
+                playlist_id=playlist_id,
+                fields=fields_param(PlaylistObject, fields),
+                market=market,
+                additional_types=additional_types,
+            )
+        return self._parse_fields(PlaylistObject, data, fields)
+
+    def _playlist_conditional(
+        self,
+        store: ResponseStore,
+        playlist_id: str,
+        fields: str | Projection[PlaylistObject] | None,
+        market: str | None,
+        additional_types: Iterable[str],
+    ) -> PlaylistObject:
+        """ `playlist` through `store`, i.e. `self.response_store`: the stored ETag is sent as If-None-Match,
+            and on 304 Not Modified the stored playlist is returned without a body to transfer or parse.
+            The same object is returned as long as the playlist is unchanged, so treat it as read-only.
+        """
+        url = f'playlists/{spotify_id(playlist_id)}'
+        params = {
+            'fields': fields_param(PlaylistObject, fields),
+            'market': market,
+            'additional_types': ','.join(additional_types),
+        }
+        key = store.key(url, params)
+        stored = store.get(key)
+        headers = {'If-None-Match': stored.etag} if stored else None
+        response = self._get_response(url, headers=headers, **params)
+
+        if response.status_code == 304:
+            if stored:
+                if stored.parsed is None:
+                    # Loaded from disk, parsed once per process.
+                    stored.parsed = self._parse_fields(PlaylistObject, stored.data, fields)
+                return stored.parsed
+            # Nothing stored to answer with, e.g. a condition added by the session or a proxy. Ask for the body.
+            response = self._get_response(url, headers={'Cache-Control': 'no-cache'}, **params)
+
+        data = loads(response.content)
+        playlist = self._parse_fields(PlaylistObject, data, fields)
+        if etag := response.headers.get('ETag'):
+            store.put(key, etag=etag, data=data, parsed=playlist)
+        return playlist
 
     def playlist_items(
         self,
         playlist_id: str,
-        fields: list[str] | None = None,
+        fields: str | Projection[PagedPlaylistTrackObject] | None = None,
         limit: int = 100,
         offset: int = 0,
         market: str | None = None,
@@ -408,24 +671,84 @@ class SpotipyClient:
 
             Parameters:
                 - playlist_id - the playlist ID, URI or URL
-                - fields - which fields to return
+                - fields - which fields to return, as a string or a `Projection` of `PagedPlaylistTrackObject`.
+                           The result is a partial object with only those fields.
                 - limit - the maximum number of tracks to return
                 - offset - the index of the first track to return
                 - market - an ISO 3166-1 alpha-2 country code.
                 - additional_types - list of item types to return.
                                      valid types are: track and episode
         """
-        return PagedPlaylistTrackObject(
-            **self.sp.playlist_items(
-                playlist_id=playlist_id,
+        data = self._playlist_items(
+            playlist_id=playlist_id,
+            fields=fields_param(PagedPlaylistTrackObject, fields),
+            limit=limit,
+            offset=offset,
+            market=market,
+            additional_types=additional_types,
+        )
+        return self._parse_fields(PagedPlaylistTrackObject, data, fields)
+
+    def _playlist_items(
+        self,
+        playlist_id: str,
+        fields: str | None,
+        limit: int,
+        offset: int,
+        market: str | None,
+        additional_types: Iterable[str],
+    ) -> dict[str, Any]:
+        if self.fast:
+            return self._get(
+                f'playlists/{spotify_id(playlist_id)}/tracks',
                 fields=fields,
                 limit=limit,
                 offset=offset,
                 market=market,
-                additional_types=additional_types,
+                additional_types=','.join(additional_types),
             )
+        return self.sp.playlist_items(
+            playlist_id=playlist_id,
+            fields=fields,
+            limit=limit,
+            offset=offset,
+            market=market,
+            additional_types=additional_types,
         )
 
+    def iter_playlist_items(
+        self,
+        playlist_id: str,
+        fields: str | Projection[PagedPlaylistTrackObject] | None = None,
+        limit: int = 100,
+        offset: int = 0,
+        market: str | None = None,
+        additional_types: Iterable[str] = ("track", "episode"),
+    ) -> Iterator[PlaylistTrackObject]:
+        """ Iterate over all tracks and episodes of a playlist by following `next` until the last page.
+
+            The next page is fetched on a background thread while the current page is consumed,
+            so at most two pages are held in memory at a time.
+
+            Parameters:
+                - same as `playlist_items`. `next` is added to `fields` to follow the pages.
+        """
+        if fields:
+            fields = with_field(fields, 'next')
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            data = self._playlist_items(
+                playlist_id=playlist_id,
+                fields=fields_param(PagedPlaylistTrackObject, fields),
+                limit=limit,
+                offset=offset,
+                market=market,
+                additional_types=additional_types,
+            )
+            while data:
+                next_page = executor.submit(self._next, data) if data.get('next') else None
+                yield from self._parse_fields(PagedPlaylistTrackObject, data, fields).items
+                data = next_page.result() if next_page else None
+
     def playlist_cover_image(
         self,
         playlist_id: str,
@@ -470,7 +793,8 @@ class SpotipyClient:
                 - limit  - the number of items to return
                 - offset - the index of the first item to return
         """#
-        return self.sp.user_playlists(user=user, limit=limit, offset=offset)
+        data = self.sp.user_playlists(user=user, limit=limit, offset=offset)
+        return self._parse(PagedSimplifiedPlaylistObject, data)
 
     def user_playlist_create(
         self,
@@ -491,8 +815,9 @@ class SpotipyClient:
                 - collaborative - is the created playlist collaborative
                 - description - the description of the playlist
         """
-        return PlaylistObject(
-            **self.sp.user_playlist_create(
+        return self._parse(
+            PlaylistObject,
+            self.sp.user_playlist_create(
                 user=user,
                 name=name,
                 public=public,
@@ -577,7 +902,7 @@ class SpotipyClient:
         playlist_id: str,
         items: Iterable[str],
         position: int | None = None,
-    ) -> str:
+    ) -> dict[str, Any]:
         """ Adds tracks/episodes to a playlist
         
         https://developer.spotify.com/documentation/web-api/reference/add-tracks-to-playlist
@@ -589,6 +914,34 @@ class SpotipyClient:
         """#
         return self.sp.playlist_add_items(playlist_id=playlist_id, items=items, position=position)
 
+    def playlist_add_items_bulk(
+        self,
+        playlist_id: str,
+        items: Iterable[str],
+        position: int | None = None,
+        batch_size: int = 100,
+    ) -> BulkAddResult:
+        """ Adds any number of tracks/episodes to a playlist, split into batches of max 100 items.
+
+            Batches are sent in order, each inserted after the previous one, and the items
+            iterable is consumed lazily so a generator can be streamed straight into the playlist.
+
+            Parameters:
+                - playlist_id - the id of the playlist
+                - items - an iterable of track/episode URIs or URLs
+                - position - the position to add the first item, appends to the end if None
+                - batch_size - number of items per request, maximum: 100
+        """
+        result = BulkAddResult()
+        for batch in chunks(items, min(batch_size, 100)):
+            batch_position = position + result.total if position is not None else None
+            start = time.perf_counter()
+            response = self.sp.playlist_add_items(playlist_id=playlist_id, items=batch, position=batch_position)
+            result.batch_latencies_s.append(time.perf_counter() - start)
+            result.batch_sizes.append(len(batch))
+            result.snapshot_ids.append(response['snapshot_id'])
+        return result
+
     def playlist_replace_items(
         self,
         playlist_id: str,
@@ -1026,7 +1379,58 @@ class SpotipyClient:
             Parameters:
                 - tracks - a list of track URIs, URLs or IDs, maximum: 100 ids
         """
-        return [AudioFeaturesObject(**data) for data in self.sp.audio_features(tracks=tracks)]
+        return [self._parse(AudioFeaturesObject, data) for data in self._audio_features(tracks) if data]
+
+    def _audio_features(self, tracks: Iterable[str]) -> list[dict[str, Any] | None]:
+        if self.fast:
+            return self._get('audio-features', ids=','.join(spotify_id(track) for track in tracks))['audio_features']
+        return self.sp.audio_features(tracks=tracks)
+
+    def audio_features_batched(
+        self,
+        tracks: Iterable[str],
+        cache: AudioFeaturesCache | None = None,
+        max_workers: int = 4,
+    ) -> list[AudioFeaturesObject]:
+        """ Get audio features for any number of tracks.
+
+            IDs are split into windows of 100 which are requested concurrently.
+            Tracks found in `cache` are not requested, newly fetched features are stored in it.
+            Tracks without audio features are left out of the result, otherwise the input order is kept.
+
+            Parameters:
+                - tracks - a list of track URIs, URLs or IDs
+                - cache - optional persistent cache of audio features
+                - max_workers - maximum number of concurrent requests
+        """
+        return [
+            self._parse(AudioFeaturesObject, data)
+            for data in self.audio_features_batched_raw(tracks=tracks, cache=cache, max_workers=max_workers)
+        ]
+
+    def audio_features_batched_raw(
+        self,
+        tracks: Iterable[str],
+        cache: AudioFeaturesCache | None = None,
+        max_workers: int = 4,
+    ) -> list[dict[str, Any]]:
+        """ Same as `audio_features_batched`, but returns the raw responses,
+            e.g. for `AudioFeaturesTable.from_dicts` which does not need the dataclasses.
+        """
+        ids = [spotify_id(track) for track in tracks]
+        features_by_id = cache.get_many(ids) if cache else {}
+        missing = list(dict.fromkeys(track_id for track_id in ids if track_id not in features_by_id))
+
+        def fetch(window: list[str]) -> list[dict[str, Any]]:
+            return [data for data in self._audio_features(window) if data]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for fetched in executor.map(fetch, chunks(missing, 100)):
+                features_by_id.update((data['id'], data) for data in fetched)
+                if cache:
+                    cache.put_many(fetched)
+
+        return [features_by_id[track_id] for track_id in ids if track_id in features_by_id]
 
     def devices(self, ):
         """ Get a list of user's available devices."""
@@ -1045,8 +1449,11 @@ class SpotipyClient:
                 - market - an ISO 3166-1 alpha-2 country code.
                 - additional_types - `episode` to get podcast track information
         """
-        state = self.sp.current_playback(market=market, additional_types=additional_types)
-        return PlaybackState(**state) if state else state
+        if self.fast:
+            state = self._get('me/player', market=market, additional_types=additional_types)
+        else:
+            state = self.sp.current_playback(market=market, additional_types=additional_types)
+        return self._parse(PlaybackState, state) if state else state
 
     def currently_playing(
         self,
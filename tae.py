@@ -2,8 +2,7 @@
 The Atheist Experience.
 Copy all episodes into playlist.
 """
-import math
-from mytypes.types import PagedSimplifiedEpisodeObject, Show, SimplifiedEpisodeObject
+from mytypes.types import PlaylistObject, Show
 
 from utils import Scope
 from spotipy_client import SpotipyClient
@@ -11,31 +10,15 @@ from spotipy_client import SpotipyClient
 USER = 'emiltelstad'
 PODCAST = 'https://open.spotify.com/show/770WPA1HnBVJ3b2gzliMDJ?si=3d98ab3e37e6416a'
 
-if __name__ == '__main__':
 
-    sp = SpotipyClient(
-        username=USER,
-        scope=[Scope.playlist_modify_private, Scope.playlist_modify_public],
-    )
+def copy_show_to_playlist(client: SpotipyClient, show_id: str, user: str, name: str) -> PlaylistObject:
+    """Create a playlist with all episodes of a show, oldest first."""
 
-    show: Show = sp.show(show_id=PODCAST)
-    pl = sp.user_playlist_create(name='TAE episodes', public=False, user=USER)
-
-    limit = 50  # Max episode retrieval per page.
-
-    # Minimum loops required to find all songs with bucket size of `limit`.
-    l = math.ceil(show.total_episodes / 50)
-
-    episodes: list[SimplifiedEpisodeObject] = []
+    show: Show = client.show(show_id=show_id)
+    pl = client.user_playlist_create(name=name, public=False, user=user)
 
     # Find all songs.
-    for offset in range(l):
-        paged_episodes: PagedSimplifiedEpisodeObject = sp.show_episodes(
-            show_id=PODCAST,
-            limit=limit,
-            offset=limit * offset,
-        )
-        episodes.extend(paged_episodes.items)
+    episodes = client.all_show_episodes(show_id=show_id, total_episodes=show.total_episodes)
 
     # Sort.
     episodes_by_release_date = sorted(episodes, key=lambda item: item.release_date)
@@ -43,13 +26,16 @@ if __name__ == '__main__':
     # Extract uris.
     episode_uris = [item.uri for item in episodes_by_release_date]
 
-    m = 100  # Max add limit.
+    # Add all songs.
+    client.playlist_add_items_bulk(playlist_id=pl.uri, items=episode_uris)
+    return pl
 
-    # Minimum loops required to add all songs with bucket size of `m`.
-    add_loops = math.ceil((len(episodes_by_release_date) / 100))
 
-    # Add all songs.
-    for i in range(add_loops):
-        lower_i = m * i
-        upper_i = m * (i + 1)
-        sp.playlist_add_items(playlist_id=pl.uri, items=episode_uris[lower_i:upper_i])
+if __name__ == '__main__':
+
+    sp = SpotipyClient(
+        username=USER,
+        scope=[Scope.playlist_modify_private, Scope.playlist_modify_public],
+    )
+
+    copy_show_to_playlist(client=sp, show_id=PODCAST, user=USER, name='TAE episodes')
@@ -0,0 +1,43 @@
+import asyncio
+
+from async_spotipy_client import AsyncSpotipyClient
+from benchmarks import synthetic
+from benchmarks.stub_server import StubConfig, StubServer
+
+
+def test_audio_features_skips_unknown_ids() -> None:
+    tracks = [synthetic.object_id('track', 0), synthetic.object_id('episode', 0), synthetic.object_id('track', 1)]
+
+    async def audio_features() -> list[str]:
+        with StubServer(StubConfig(n_playlists=1, n_tracks=10)) as server:
+            client = AsyncSpotipyClient(api_prefix=server.api_prefix, access_token='test')
+            async with client:
+                return [features.id for features in await client.audio_features(tracks)]
+
+    assert asyncio.run(audio_features()) == [tracks[0], tracks[2]]
+
+
+def test_concurrent_pages_are_limited() -> None:
+    in_flight = max_in_flight = 0
+
+    async def show_episodes() -> int:
+        nonlocal in_flight, max_in_flight
+        with StubServer(StubConfig(n_playlists=1, n_tracks=10, n_episodes=500, latency_s=0.02)) as server:
+            client = AsyncSpotipyClient(api_prefix=server.api_prefix, access_token='test', max_concurrent_requests=3)
+
+            async def count(request: object) -> None:
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+
+            async def uncount(response: object) -> None:
+                nonlocal in_flight
+                in_flight -= 1
+
+            client.http.event_hooks = {'request': [count], 'response': [uncount]}
+            async with client:
+                episodes = await client.all_show_episodes(synthetic.object_id('show', 0))
+            return len(episodes)
+
+    assert asyncio.run(show_episodes()) == 500
+    assert max_in_flight == 3
@@ -0,0 +1,28 @@
+import time
+from pathlib import Path
+
+from benchmarks.stub_server import StubConfig, StubServer
+from cassette import Cassette
+from spotipy_client import SpotipyClient
+
+REQUESTS = 40
+
+
+def test_zero_latency_replay_is_not_rate_limited(tmp_path: Path) -> None:
+    path = str(tmp_path / 'test.cassette.json.gz')
+    cassette = Cassette.record(path)
+    with StubServer(StubConfig(n_playlists=1, n_tracks=10)) as server:
+        api_prefix, playlist_id = server.api_prefix, server.playlist_ids[0]
+        client = SpotipyClient(username='test', api_prefix=api_prefix, access_token='test', cassette=cassette)
+        recorded = [client.playlist(playlist_id).name for _ in range(REQUESTS)]
+    cassette.save()
+
+    replay = Cassette.load(path, latency='zero')
+    client = SpotipyClient(username='test', api_prefix=api_prefix, cassette=replay)
+    start = time.perf_counter()
+    replayed = [client.playlist(playlist_id).name for _ in range(REQUESTS)]
+
+    # Paced by the default rate limit, the requests beyond its burst would take about 2 s.
+    assert time.perf_counter() - start < 1
+    assert replayed == recorded
+    assert replay.remaining == 0
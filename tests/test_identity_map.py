@@ -0,0 +1,54 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+
+from async_spotipy_client import AsyncSpotipyClient
+from benchmarks.stub_server import StubConfig, StubServer
+from mytypes.identity import IdentityMap
+from mytypes.projection import Projection
+from mytypes.types import PagedPlaylistTrackObject, SimplifiedAlbumObject, TrackObject
+from spotipy_client import SpotipyClient
+
+PROJECTION = Projection(PagedPlaylistTrackObject, 'items.track.uri', 'items.track.album.uri')
+
+
+@pytest.fixture
+def server() -> Iterator[StubServer]:
+    with StubServer(StubConfig(n_playlists=1, n_tracks=10)) as server:
+        yield server
+
+
+def first_album(page: PagedPlaylistTrackObject) -> SimplifiedAlbumObject:
+    track = page.items[0].track
+    assert isinstance(track, TrackObject)
+    return track.album
+
+
+@pytest.mark.parametrize('fields', [PROJECTION, str(PROJECTION)])
+def test_projected_read_does_not_replace_full_objects(server: StubServer, fields: Projection | str) -> None:
+    identity_map = IdentityMap()
+    client = SpotipyClient(api_prefix=server.api_prefix, access_token='test', identity_map=identity_map)
+    playlist_id = server.playlist_ids[0]
+
+    partial = client.playlist_items(playlist_id, fields=fields)
+    full = client.playlist_items(playlist_id)
+
+    assert first_album(full).uri == first_album(partial).uri
+    assert first_album(full).release_date
+    assert first_album(full) is not first_album(partial)
+    # Full reads still share their entities.
+    assert first_album(client.playlist_items(playlist_id)) is first_album(full)
+
+
+def test_projected_read_does_not_replace_full_objects_async(server: StubServer) -> None:
+
+    async def read() -> tuple[PagedPlaylistTrackObject, PagedPlaylistTrackObject]:
+        client = AsyncSpotipyClient(api_prefix=server.api_prefix, access_token='test', identity_map=IdentityMap())
+        playlist_id = server.playlist_ids[0]
+        partial = await client.playlist_items(playlist_id, fields=PROJECTION)
+        return partial, await client.playlist_items(playlist_id)
+
+    partial, full = asyncio.run(read())
+    assert first_album(full).release_date
+    assert first_album(full) is not first_album(partial)
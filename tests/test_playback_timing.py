@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks import synthetic
+from mytypes.types import PlaybackState
+from playback_timing import PlaybackClock
+
+
+def test_position_is_read_halfway_through_the_round_trip_regardless_of_timestamp() -> None:
+    clock = PlaybackClock()
+    # Playback last changed 8 s before the request, as after a seek.
+    state = PlaybackState(**synthetic.playback_state(progress_ms=20_000, timestamp=92_000))
+
+    clock.observe_rtt(0.2)
+    clock.observe_playback(state, sent_s=100.0, received_s=100.2)
+
+    assert clock.read_at_s(state) == pytest.approx(100.1)
+    assert clock.position_ms(state, now_s=100.2) == 20_100
+    assert clock.local_time_at(state, 21_000) == pytest.approx(101.1)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from typing import Any, Literal
+
+import pytest
+
+from benchmarks import synthetic
+from mytypes.types import PlaybackState
+from playback_watcher import PlaybackWatcher, RepeatN, SetRepeat, SleepTimer
+from spotipy_client import SpotipyClient
+
+
+class FakeClient(SpotipyClient):
+    """Answers `current_playback` with `state` and records the commands sent, without any requests."""
+
+    def __init__(self, state: PlaybackState | None = None) -> None:
+        self.state = state
+        self.calls: list[str] = []
+
+    def current_playback(
+        self,
+        market: str | None = None,
+        additional_types: Any | None = None,
+    ) -> PlaybackState | None:
+        self.calls.append('current_playback')
+        return self.state
+
+    def repeat(self, state: Literal['track', 'context', 'off'], device_id: str | None = None) -> None:
+        self.calls.append(f'repeat {state}')
+
+    def pause_playback(self, device_id: str | None = None) -> None:
+        self.calls.append('pause_playback')
+
+
+def state(track: int, progress_ms: int) -> PlaybackState:
+    return PlaybackState(**synthetic.playback_state(synthetic.track(track), progress_ms=progress_ms))
+
+
+def play(track: int) -> list[PlaybackState]:
+    """States polled during one play of `track`: start, middle, and inside the end window."""
+    duration_ms = synthetic.track(track)['duration_ms']
+    return [
+        state(track, 500),
+        state(track, duration_ms // 2),
+        state(track, duration_ms - RepeatN.END_WINDOW_S * 1000 + 1000),
+    ]
+
+
+@pytest.mark.parametrize('times', [1, 2, 3])
+def test_repeat_n_turns_repeat_off_once_the_last_play_has_begun(times: int) -> None:
+    watcher = PlaybackWatcher(client=FakeClient(), policies=[RepeatN(times=times)])
+
+    actions_by_play = []
+    for _ in range(times):
+        actions_by_play.append([action for polled in play(0) for action in watcher.react(polled)])
+    next_track = watcher.react(state(1, 500))
+
+    first_play_repeat = SetRepeat(state='track' if times > 1 else 'off')
+    assert actions_by_play[0] == [first_play_repeat]
+    for actions in actions_by_play[1:-1]:
+        assert actions == []
+    if times > 1:
+        assert actions_by_play[-1] == [SetRepeat(state='off')]
+    assert next_track == [first_play_repeat]
+
+
+def test_repeat_n_counts_a_play_only_when_the_song_starts_over() -> None:
+    client = FakeClient()
+    watcher = PlaybackWatcher(client=client, policies=[RepeatN(times=2)])
+
+    for polled in play(0):
+        watcher.execute(watcher.react(polled), polled)
+    # Polled again at the end of the same play.
+    duration_ms = synthetic.track(0)['duration_ms']
+    assert watcher.react(state(0, duration_ms - 500)) == []
+    assert client.calls == ['repeat track']
+
+    restarted = state(0, 500)
+    watcher.execute(watcher.react(restarted), restarted)
+    assert client.calls == ['repeat track', 'repeat off']
+
+
+def test_sleep_timer_alone_polls_only_when_it_is_due() -> None:
+    client = FakeClient(state(0, 500))
+    watcher = PlaybackWatcher(client=client, policies=[SleepTimer(after_s=0.2)])
+
+    watcher.run(max_duration=timedelta(seconds=5))
+
+    assert watcher.stopped
+    assert client.calls == ['current_playback', 'pause_playback']
@@ -0,0 +1,102 @@
+import time
+import logging
+import threading
+from typing import Any
+
+import requests
+from spotipy.oauth2 import SpotifyOAuth
+
+logger = logging.getLogger(__name__)
+
+# Refresh this long before the access token expires.
+REFRESH_MARGIN_S = 5 * 60
+# Wait this long before trying again when a refresh fails.
+RETRY_DELAY_S = 30
+
+
+class TokenManager:
+    """
+    Keeps a user's access token in memory and refreshes it on a background timer shortly before it expires,
+    so requests never read the cache file or block on a refresh.
+    Implements the `get_access_token` interface spotipy expects from an auth manager.
+
+    Env vars must be set:
+    SPOTIPY_CLIENT_ID=...
+    SPOTIPY_CLIENT_SECRET=...
+    SPOTIPY_REDIRECT_URI=...
+    """
+
+    def __init__(
+        self,
+        username: str,
+        scope: str | None = None,
+        requests_session: requests.Session | bool = True,
+        refresh_margin_s: float = REFRESH_MARGIN_S,
+    ) -> None:
+        self.refresh_margin_s = refresh_margin_s
+        self.oauth = SpotifyOAuth(scope=scope, username=username, requests_session=requests_session)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+        # Same flow as spotipy.util.prompt_for_user_token, only done once.
+        token_info = self.oauth.validate_token(self.oauth.cache_handler.get_cached_token())
+        if not token_info:
+            code = self.oauth.get_auth_response()
+            self.oauth.get_access_token(code, as_dict=False, check_cache=False)
+            token_info = self.oauth.cache_handler.get_cached_token()
+        self._set_token_info(token_info)
+
+    def get_access_token(self, as_dict: bool = False) -> str | dict[str, Any]:
+        with self._lock:
+            token_info = self._token_info
+        if token_info['expires_at'] <= time.time():
+            # Background refresh has failed, refresh in the request path as a last resort.
+            with self._refresh_lock:
+                # Another caller may have refreshed while this one waited for the lock.
+                with self._lock:
+                    token_info = self._token_info
+                if token_info['expires_at'] <= time.time():
+                    token_info = self._refresh()
+        return token_info if as_dict else token_info['access_token']
+
+    def cached_access_token(self) -> str | None:
+        """The access token in memory, None if it has expired and `get_access_token` would have to refresh it."""
+        with self._lock:
+            token_info = self._token_info
+        return token_info['access_token'] if token_info['expires_at'] > time.time() else None
+
+    def refresh(self) -> dict[str, Any]:
+        # Only one refresh at a time, readers keep getting the current token meanwhile.
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> dict[str, Any]:
+        # Callers hold `_refresh_lock`.
+        token_info = self.oauth.refresh_access_token(self._token_info['refresh_token'])
+        self._set_token_info(token_info)
+        return token_info
+
+    def stop(self) -> None:
+        """Cancel the scheduled refresh."""
+        if self._timer:
+            self._timer.cancel()
+
+    def _set_token_info(self, token_info: dict[str, Any]) -> None:
+        with self._lock:
+            self._token_info = token_info
+        delay = max(token_info['expires_at'] - time.time() - self.refresh_margin_s, 0)
+        self._schedule(delay)
+
+    def _schedule(self, delay: float) -> None:
+        self.stop()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Failed to refresh access token, retrying in %s seconds', RETRY_DELAY_S)
+            self._schedule(RETRY_DELAY_S)
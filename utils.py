@@ -1,3 +1,9 @@
+from itertools import islice
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
 class Scope:
     """
     https://developer.spotify.com/documentation/web-api/concepts/scopes
@@ -27,7 +33,7 @@ class Scope:
     user_create_partner = 'user-create-partner'
 
 
-def scope_builder(*scopes: str | list[str]):
+def scope_builder(*scopes: str | list[str] | None) -> str | None:
 
     if len(scopes) == 0 or scopes[0] is None:
         return None
@@ -42,6 +48,31 @@ def scope_builder(*scopes: str | list[str]):
     return ' '.join(scopes)
 
 
+def chunks(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def spotify_id(value: str) -> str:
+    """Extract the ID from a Spotify URI (spotify:track:<id>), URL (https://open.spotify.com/track/<id>?si=...) or ID."""
+    if value.startswith('spotify:'):
+        return value.rsplit(':', 1)[-1]
+    if 'open.spotify.com' in value:
+        return value.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+    return value
+
+
+def spotify_uri(value: str, type: str = 'track') -> str:
+    """Convert a Spotify URL or ID of the given type to a URI, URIs are returned as is."""
+    if value.startswith('spotify:'):
+        return value
+    if 'open.spotify.com' in value:
+        type = value.split('?', 1)[0].rstrip('/').rsplit('/', 2)[-2]
+    return f'spotify:{type}:{spotify_id(value)}'
+
+
 if __name__ == '__main__':
     print(1, scope_builder(Scope.playlist_modify_private))
     print(2, scope_builder(Scope.playlist_modify_private, Scope.playlist_modify_public))